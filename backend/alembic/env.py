@@ -1,6 +1,4 @@
 from logging.config import fileConfig
-import os
-from dotenv import load_dotenv
 import asyncio
 
 from sqlalchemy.ext.asyncio import create_async_engine
@@ -21,18 +19,17 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 
-# Load environment variables
-# load_dotenv(os.path.join(os.getcwd(), '.env'))
-load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
+# DATABASE_URL comes from the app settings, which read the environment and .env.
+from app.core.config import settings
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = settings.DATABASE_URL
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is missing! Fix your .env file.")
 
 
 # Import Base from your FastAPI app's db.py
 from app.db import Base
-from app.models import user, attendance # Import all models here
+from app.models import user, attendance, rollup, version # Import all models here
 
 target_metadata = Base.metadata
 
@@ -54,10 +51,6 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = os.getenv("DATABASE_URL")
-    if not url:
-        raise RuntimeError("DATABASE_URL not found. Check your .env file and load path.")
-
     context.configure(
         url=DATABASE_URL,
         target_metadata=target_metadata,
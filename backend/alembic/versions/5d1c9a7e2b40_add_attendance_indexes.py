@@ -0,0 +1,52 @@
+"""Add attendance lookup index and one-open-session constraint
+
+Revision ID: 5d1c9a7e2b40
+Revises: ff82819b9349
+Create Date: 2025-12-02 10:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1c9a7e2b40'
+down_revision: Union[str, None] = 'ff82819b9349'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Close duplicate open sessions left behind by the old select-then-insert
+    # check-in, keeping the most recent one per user, so the unique index builds.
+    op.execute(
+        """
+        UPDATE attendance SET check_out = check_in, total_hours = 0
+        WHERE check_out IS NULL
+          AND id NOT IN (
+              SELECT DISTINCT ON (user_id) id FROM attendance
+              WHERE check_out IS NULL
+              ORDER BY user_id, check_in DESC NULLS LAST, id DESC
+          )
+        """
+    )
+    op.create_index(
+        'ix_attendance_user_id_check_in',
+        'attendance',
+        ['user_id', sa.text('check_in DESC')],
+        unique=False,
+    )
+    op.create_index(
+        'uq_attendance_user_id_open',
+        'attendance',
+        ['user_id'],
+        unique=True,
+        postgresql_where=sa.text('check_out IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_attendance_user_id_open', table_name='attendance')
+    op.drop_index('ix_attendance_user_id_check_in', table_name='attendance')
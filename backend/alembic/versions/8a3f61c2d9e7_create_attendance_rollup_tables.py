@@ -0,0 +1,74 @@
+"""Create attendance daily and weekly rollup tables
+
+Revision ID: 8a3f61c2d9e7
+Revises: 5d1c9a7e2b40
+Create Date: 2025-12-04 14:03:27.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3f61c2d9e7'
+down_revision: Union[str, None] = '5d1c9a7e2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('attendance_daily_rollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('total_hours', sa.Float(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_index('ix_attendance_daily_rollup_day', 'attendance_daily_rollup', ['day'], unique=False)
+    op.create_table('attendance_weekly_rollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('week_start', sa.Date(), nullable=False),
+    sa.Column('total_hours', sa.Float(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'week_start')
+    )
+    op.create_index('ix_attendance_weekly_rollup_week_start', 'attendance_weekly_rollup', ['week_start'], unique=False)
+
+    # Backfill from existing sessions; same queries as app.rollups.rebuild.
+    op.execute(
+        """
+        INSERT INTO attendance_daily_rollup (user_id, day, total_hours, sessions)
+        SELECT a.user_id,
+               d.day::date,
+               SUM(EXTRACT(EPOCH FROM LEAST(a.check_out, d.day + INTERVAL '1 day')
+                                    - GREATEST(a.check_in, d.day)) / 3600.0),
+               COUNT(*) FILTER (WHERE d.day = date_trunc('day', a.check_in))
+        FROM attendance a
+        CROSS JOIN LATERAL generate_series(date_trunc('day', a.check_in), a.check_out, INTERVAL '1 day') AS d(day)
+        WHERE a.user_id IS NOT NULL
+          AND a.check_in IS NOT NULL
+          AND a.check_out IS NOT NULL
+          AND (LEAST(a.check_out, d.day + INTERVAL '1 day') > GREATEST(a.check_in, d.day)
+               OR d.day = date_trunc('day', a.check_in))
+        GROUP BY a.user_id, d.day
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO attendance_weekly_rollup (user_id, week_start, total_hours, sessions)
+        SELECT user_id, date_trunc('week', day)::date, SUM(total_hours), SUM(sessions)
+        FROM attendance_daily_rollup
+        GROUP BY user_id, date_trunc('week', day)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendance_weekly_rollup_week_start', table_name='attendance_weekly_rollup')
+    op.drop_table('attendance_weekly_rollup')
+    op.drop_index('ix_attendance_daily_rollup_day', table_name='attendance_daily_rollup')
+    op.drop_table('attendance_daily_rollup')
@@ -0,0 +1,149 @@
+"""Partition attendance by month of check_in
+
+Revision ID: c4d81e6a7f20
+Revises: b7e2049c5f13
+Create Date: 2025-12-16 09:41:27.203914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.attendance import CREATE_PARTITION_DDL, DEFAULT_PARTITION_DDL, OPEN_SESSION_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d81e6a7f20'
+down_revision: Union[str, None] = 'b7e2049c5f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months of empty partitions created ahead of today; `maintain_partitions.py`
+# keeps topping this up.
+PARTITIONS_AHEAD = 3
+
+# A partitioned table cannot carry the partial unique index that allowed one
+# open session per user (unique indexes must include check_in). The rule moves
+# to attendance_open, kept in step by triggers. A second open session is
+# silently skipped by the BEFORE INSERT trigger, so check-in's
+# INSERT ... ON CONFLICT DO NOTHING RETURNING still comes back empty.
+#
+# The triggers, the default partition and attendance_create_partition (which
+# creates a month's partition, first moving any rows that landed in
+# attendance_default while it was missing) are shared with the models, which
+# build the same schema for create_all. One statement per execute: asyncpg
+# cannot prepare several at once.
+
+
+def upgrade() -> None:
+    op.rename_table('attendance', 'attendance_unpartitioned')
+    op.drop_index('uq_attendance_user_id_open', table_name='attendance_unpartitioned')
+    op.drop_index('ix_attendance_user_id_check_in', table_name='attendance_unpartitioned')
+    op.drop_index('ix_attendance_id', table_name='attendance_unpartitioned')
+    op.execute('ALTER TABLE attendance_unpartitioned RENAME CONSTRAINT attendance_pkey TO attendance_unpartitioned_pkey')
+    op.execute('ALTER SEQUENCE attendance_id_seq OWNED BY NONE')
+
+    # check_in becomes part of the primary key, as the partition key must be.
+    op.execute(
+        """
+        CREATE TABLE attendance (
+            id integer NOT NULL DEFAULT nextval('attendance_id_seq'),
+            user_id integer REFERENCES users (id),
+            check_in timestamp without time zone NOT NULL,
+            check_out timestamp without time zone,
+            total_hours double precision,
+            PRIMARY KEY (id, check_in)
+        ) PARTITION BY RANGE (check_in)
+        """
+    )
+    op.execute('ALTER SEQUENCE attendance_id_seq OWNED BY attendance.id')
+    op.execute(DEFAULT_PARTITION_DDL)
+    op.create_index('ix_attendance_id', 'attendance', ['id'], unique=False)
+    op.create_index(
+        'ix_attendance_user_id_check_in',
+        'attendance',
+        ['user_id', sa.text('check_in DESC')],
+        unique=False,
+    )
+    op.create_index(
+        'ix_attendance_user_id_open',
+        'attendance',
+        ['user_id'],
+        unique=False,
+        postgresql_where=sa.text('check_out IS NULL'),
+    )
+
+    op.create_table('attendance_open',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('attendance_id', sa.Integer(), nullable=False),
+    sa.Column('check_in', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    for statement in OPEN_SESSION_DDL:
+        op.execute(statement)
+    op.execute(CREATE_PARTITION_DDL)
+
+    op.execute(
+        f"""
+        SELECT attendance_create_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min(check_in) FROM attendance_unpartitioned), now())),
+            date_trunc('month', now()) + interval '{PARTITIONS_AHEAD} months',
+            interval '1 month'
+        ) AS month
+        """
+    )
+    # Sessions without a check-in cannot be routed by month; they keep their
+    # place in history via the default partition.
+    op.execute(
+        """
+        INSERT INTO attendance (id, user_id, check_in, check_out, total_hours)
+        SELECT id, user_id, COALESCE(check_in, check_out, 'epoch'), check_out, total_hours
+        FROM attendance_unpartitioned
+        """
+    )
+    op.drop_table('attendance_unpartitioned')
+
+
+def downgrade() -> None:
+    # Partitions already detached by retention are not brought back.
+    op.rename_table('attendance', 'attendance_partitioned')
+    op.execute('ALTER TABLE attendance_partitioned RENAME CONSTRAINT attendance_pkey TO attendance_partitioned_pkey')
+    op.execute('ALTER SEQUENCE attendance_id_seq OWNED BY NONE')
+    op.create_table('attendance',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('attendance_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('check_in', sa.DateTime(), nullable=True),
+    sa.Column('check_out', sa.DateTime(), nullable=True),
+    sa.Column('total_hours', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute('ALTER SEQUENCE attendance_id_seq OWNED BY attendance.id')
+    op.execute(
+        """
+        INSERT INTO attendance (id, user_id, check_in, check_out, total_hours)
+        SELECT id, user_id, check_in, check_out, total_hours FROM attendance_partitioned
+        """
+    )
+    op.execute('DROP TABLE attendance_partitioned')
+    op.drop_table('attendance_open')
+    op.execute('DROP FUNCTION attendance_create_partition(date)')
+    op.execute('DROP FUNCTION attendance_open_after_close()')
+    op.execute('DROP FUNCTION attendance_open_before_insert()')
+    op.create_index(op.f('ix_attendance_id'), 'attendance', ['id'], unique=False)
+    op.create_index(
+        'ix_attendance_user_id_check_in',
+        'attendance',
+        ['user_id', sa.text('check_in DESC')],
+        unique=False,
+    )
+    op.create_index(
+        'uq_attendance_user_id_open',
+        'attendance',
+        ['user_id'],
+        unique=True,
+        postgresql_where=sa.text('check_out IS NULL'),
+    )
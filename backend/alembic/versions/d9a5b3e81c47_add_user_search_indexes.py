@@ -0,0 +1,48 @@
+"""Add user search indexes
+
+Revision ID: d9a5b3e81c47
+Revises: c4d81e6a7f20
+Create Date: 2025-12-18 14:03:55.871260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a5b3e81c47'
+down_revision: Union[str, None] = 'c4d81e6a7f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same expression as app.search.SEARCH_DOCUMENT, or the planner won't use it.
+SEARCH_DOCUMENT = (
+    "lower(coalesce(username, '') || ' ' || coalesce(email, '') || ' ' || coalesce(full_name, ''))"
+)
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # text_pattern_ops so LIKE 'prefix%' can use the index under any collation.
+    for column in ('username', 'email', 'full_name'):
+        op.create_index(
+            f'ix_users_{column}_lower_prefix',
+            'users',
+            [sa.text(f'lower({column}) text_pattern_ops')],
+            unique=False,
+        )
+    op.create_index(
+        'ix_users_search_trgm',
+        'users',
+        [sa.text(f'({SEARCH_DOCUMENT}) gin_trgm_ops')],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_search_trgm', table_name='users')
+    for column in ('full_name', 'email', 'username'):
+        op.drop_index(f'ix_users_{column}_lower_prefix', table_name='users')
@@ -0,0 +1,43 @@
+"""Create audit_log table
+
+Revision ID: e6f1c4a92d38
+Revises: d9a5b3e81c47
+Create Date: 2026-01-08 15:12:46.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f1c4a92d38'
+down_revision: Union[str, None] = 'd9a5b3e81c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('audit_log',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('actor_username', sa.String(), nullable=True),
+    sa.Column('target_id', sa.Integer(), nullable=True),
+    sa.Column('client_ip', sa.String(), nullable=True),
+    sa.Column('details', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_audit_log_actor_id_id', 'audit_log', ['actor_id', sa.text('id DESC')], unique=False)
+    op.create_index('ix_audit_log_target_id_id', 'audit_log', ['target_id', sa.text('id DESC')], unique=False)
+    op.create_index('ix_audit_log_action_id', 'audit_log', ['action', sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_audit_log_action_id', table_name='audit_log')
+    op.drop_index('ix_audit_log_target_id_id', table_name='audit_log')
+    op.drop_index('ix_audit_log_actor_id_id', table_name='audit_log')
+    op.drop_table('audit_log')
@@ -0,0 +1,152 @@
+"""Admission control for the password-hashing endpoints.
+
+Login and signup each cost an argon2 operation, so they are metered before
+any database or hashing work: a token bucket per client IP answers 429, and a
+cap on auth requests in flight answers 503 once the hashing pool is as busy as
+we let auth traffic make it.
+
+Password guessing against one account is throttled per username whatever the
+client, but only failed logins take tokens from that bucket: a user who knows
+their password never drains it, and someone guessing at their account can
+delay their login by no more than the bucket's refill. Client IPs come from
+``X-Forwarded-For`` only when uvicorn trusts the proxy (FORWARDED_ALLOW_IPS);
+otherwise every client behind a proxy shares its address and its bucket.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Hashable, Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.security import password_hasher
+
+
+class RateLimiter:
+    """Token buckets keyed by client, refilled at ``rate_per_minute`` up to
+    ``burst``. Only the ``max_keys`` most recently seen keys are tracked; a
+    forgotten key simply starts again with a full bucket. A rate of 0
+    disables limiting.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: int,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.burst > 0
+
+    def acquire(self, key: Hashable) -> Optional[float]:
+        """Take a token for ``key``; return None, or seconds until one is free."""
+        return self._take(key, 1)
+
+    def check(self, key: Hashable) -> Optional[float]:
+        """Like ``acquire``, but leave the token in the bucket."""
+        return self._take(key, 0)
+
+    def _take(self, key: Hashable, cost: int) -> Optional[float]:
+        if not self.enabled:
+            return None
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= cost
+                retry_after = None
+                self.allowed += cost
+            else:
+                retry_after = (1 - tokens) / self.rate
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._buckets), "allowed": self.allowed, "limited": self.limited}
+
+
+def _username_key(username: str) -> str:
+    return username.strip().lower()
+
+
+class AuthAdmission:
+    def __init__(self, by_ip: RateLimiter, by_username: RateLimiter, max_concurrent: int):
+        self.by_ip = by_ip
+        # Failed logins per username; see ``failed``.
+        self.by_username = by_username
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.shed = 0
+
+    @staticmethod
+    def _check_rate(retry_after: Optional[float]) -> None:
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, please retry later",
+                headers={"Retry-After": str(max(1, round(retry_after)))},
+            )
+
+    @asynccontextmanager
+    async def admit(self, request: Request, username: Optional[str] = None):
+        """Hold an auth slot for the body of a login/signup handler; a login
+        passes the username it is for."""
+        self._check_rate(self.by_ip.acquire(request.client.host if request.client else None))
+        if username:
+            self._check_rate(self.by_username.check(_username_key(username)))
+        # Checked up front rather than when the hash is submitted, so a shed
+        # request costs neither a users lookup nor a queue slot.
+        if self.in_flight >= self.max_concurrent or password_hasher.saturated:
+            self.shed += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def failed(self, username: str) -> None:
+        """Count a failed login against ``username``."""
+        self.by_username.acquire(_username_key(username))
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "shed": self.shed,
+            **{f"ip_{name}": value for name, value in self.by_ip.stats().items()},
+            **{f"username_{name}": value for name, value in self.by_username.stats().items()},
+        }
+
+
+auth_admission = AuthAdmission(
+    by_ip=RateLimiter(
+        settings.AUTH_IP_RATE_PER_MINUTE, settings.AUTH_IP_BURST, settings.AUTH_RATE_LIMIT_MAX_KEYS
+    ),
+    by_username=RateLimiter(
+        settings.AUTH_USERNAME_RATE_PER_MINUTE, settings.AUTH_USERNAME_BURST, settings.AUTH_RATE_LIMIT_MAX_KEYS
+    ),
+    max_concurrent=settings.AUTH_MAX_CONCURRENT or password_hasher.workers * 2,
+)
@@ -0,0 +1,210 @@
+"""Audit trail of admin and auth actions, written off the request path.
+
+``audit_log.record`` only appends to an in-memory buffer. A background task
+writes the buffer to ``audit_log`` in multi-row INSERTs whenever a batch has
+filled up or AUDIT_FLUSH_INTERVAL_SECONDS has passed, and once more when the
+app shuts down. A full buffer drops new events rather than slowing requests
+down; drops and failed writes are counted on /metrics. Events are therefore
+at most a flush interval behind, and may be lost if the process dies.
+
+A batch that fails because the database is unreachable waits for the next
+flush, however long that takes. One that the database itself rejects is
+retried up to AUDIT_MAX_ATTEMPTS times and then split in halves, down to the
+single events at fault, which are logged and dropped (counted as
+``rejected``), so one bad event never holds back the rest.
+"""
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from fastapi import Request
+from sqlalchemy import exc, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.config import settings
+from app.db import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+USER_CREATE = "user.create"
+USER_UPDATE = "user.update"
+USER_DELETE = "user.delete"
+SIGNUP = "auth.signup"
+LOGIN = "auth.login"
+LOGIN_FAILED = "auth.login_failed"
+
+
+class Actor(NamedTuple):
+    id: int
+    username: str
+
+
+def actor_of(user: models.User) -> Actor:
+    """Who is acting, read while ``user`` is loaded: a commit expires it, and
+    an async session cannot reload it when ``record`` runs afterwards."""
+    return Actor(user.id, user.username)
+
+
+def _unreachable(error: Exception) -> bool:
+    """Whether ``error`` means the database could not be reached, as opposed
+    to it rejecting the batch."""
+    if isinstance(error, (OSError, asyncio.TimeoutError, exc.TimeoutError)):
+        return True
+    return isinstance(error, exc.DBAPIError) and (
+        error.connection_invalidated or isinstance(error, (exc.OperationalError, exc.InterfaceError))
+    )
+
+
+class AuditLog:
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        max_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_attempts: int = 3,
+    ):
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._buffer: deque = deque()
+        # Batches the database rejected, as (attempts, events), oldest first.
+        self._rejected: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def record(
+        self,
+        action: str,
+        request: Optional[Request] = None,
+        actor: Optional[Actor] = None,
+        target_id: Optional[int] = None,
+        details: Optional[dict] = None,
+    ) -> None:
+        """Queue an event; never blocks and never touches the database."""
+        if len(self._buffer) >= self.max_size:
+            self.dropped += 1
+            return
+        self._buffer.append(
+            {
+                "created_at": datetime.utcnow(),
+                "action": action,
+                "actor_id": actor.id if actor is not None else None,
+                "actor_username": actor.username if actor is not None else None,
+                "target_id": target_id,
+                "client_ip": request.client.host if request is not None and request.client else None,
+                "details": details,
+            }
+        )
+        self.recorded += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _write(self, events: List[dict]) -> None:
+        async with self.session_factory() as db:
+            await db.execute(insert(models.AuditEvent).values(events))
+            await db.commit()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; return how many events were written.
+
+        If the database is unreachable the batch goes back to the front of the
+        buffer for the next flush. A rejected batch is kept aside with its
+        attempts, and split once it has used them up.
+        """
+        written = 0
+        while self._rejected or self._buffer:
+            if self._rejected:
+                attempts, events = self._rejected.popleft()
+            else:
+                attempts = 0
+                events = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                await self._write(events)
+            except Exception as error:
+                self.failures += 1
+                if _unreachable(error):
+                    # Not the events' fault: no attempt is counted.
+                    logger.warning("Could not write %d audit events: %s", len(events), error)
+                    if attempts:
+                        self._rejected.appendleft((attempts, events))
+                    else:
+                        self._buffer.extendleft(reversed(events))
+                        while len(self._buffer) > self.max_size:
+                            self._buffer.pop()
+                            self.dropped += 1
+                    break
+                attempts += 1
+                if attempts < self.max_attempts:
+                    logger.exception("Could not write %d audit events (attempt %d)", len(events), attempts)
+                    self._rejected.appendleft((attempts, events))
+                    break
+                if len(events) == 1:
+                    self.rejected += 1
+                    logger.error("Dropping audit event the database keeps rejecting: %r", events[0])
+                    continue
+                # Halves keep the attempts used up, so each one that fails is
+                # split again right away until the bad events are isolated.
+                half = len(events) // 2
+                self._rejected.extendleft([(attempts, events[half:]), (attempts, events[:half])])
+                continue
+            written += len(events)
+            self.batches += 1
+        self.written += written
+        return written
+
+    async def _run(self) -> None:
+        while not self._closing:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+        await self.flush()
+
+    def start(self) -> None:
+        self._closing = False
+        self._task = asyncio.create_task(self._run(), name="audit-flush")
+
+    async def stop(self) -> None:
+        """Let the flusher finish its current batch, then write what is left.
+        Not cancelled, so no batch is lost halfway through its INSERT."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer) + sum(len(events) for _, events in self._rejected),
+            "max_size": self.max_size,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+audit_log = AuditLog(
+    AsyncSessionLocal,
+    max_size=settings.AUDIT_BUFFER_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+    max_attempts=settings.AUDIT_MAX_ATTEMPTS,
+)
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,9 +8,111 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
     DATABASE_URL: str
+    # Optional read replica for GET endpoints. A client's reads stay on the
+    # primary for READ_YOUR_WRITES_SECONDS after it writes.
+    READ_DATABASE_URL: Optional[str] = None
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # Connection pool, per worker process. Size it so that
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays below max_connections.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg prepared statement cache, per connection.
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_ECHO: bool = False
+
+    # Startup: connections opened before serving (capped at DB_POOL_SIZE), and
+    # what to do if the database is not at the Alembic head ("off", "warn" or
+    # "fail").
+    DB_POOL_WARMUP_CONNECTIONS: int = 2
+    STARTUP_MIGRATION_CHECK: Literal["off", "warn", "fail"] = "warn"
+
+    # Password hashing pool. "process" scales argon2 with the number of cores,
+    # "thread" is cheaper to start and fine for dev / single-core containers.
+    # 0 workers means os.cpu_count().
+    PASSWORD_HASH_POOL: Literal["process", "thread"] = "process"
+    PASSWORD_HASH_WORKERS: int = 0
+    # Jobs allowed to wait for a free worker before requests are rejected with 503.
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    # Start the workers and initialize argon2 at startup rather than on the
+    # first login.
+    PASSWORD_HASH_WARMUP: bool = True
+
+    # Authenticated principal cache, keyed by token subject. Admin changes to a
+    # user invalidate it on this worker; the TTL bounds staleness on the others.
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+
+    # Login/signup admission: token buckets per client IP and for failed
+    # logins per username (a rate of 0 disables one), and a cap on auth
+    # requests in flight (0 = twice the hashing workers) past which they are
+    # shed with 503. Behind a reverse proxy, set uvicorn's FORWARDED_ALLOW_IPS
+    # to the proxy's address so clients are told apart; the per-IP defaults
+    # leave room for an office's worth of users behind one NAT address.
+    AUTH_IP_RATE_PER_MINUTE: float = 300.0
+    AUTH_IP_BURST: int = 100
+    AUTH_USERNAME_RATE_PER_MINUTE: float = 10.0
+    AUTH_USERNAME_BURST: int = 5
+    AUTH_RATE_LIMIT_MAX_KEYS: int = 100000
+    AUTH_MAX_CONCURRENT: int = 0
+
+    BULK_IMPORT_MAX_ROWS: int = 10000
+
+    # Serialize list endpoints straight from row tuples (orjson when installed)
+    # instead of validating every row through the response_model.
+    FAST_JSON_RESPONSES: bool = False
+
+    # Live presence feed: NOTIFY channel shared by all workers, and how many
+    # undelivered events an SSE client may lag behind before it is resynced.
+    PRESENCE_CHANNEL: str = "attendance_presence"
+    PRESENCE_QUEUE_SIZE: int = 100
+
+    # Monthly attendance partitions: how many future months to keep created,
+    # and how many past months to keep attached (0 = forever). Expired
+    # partitions move to ATTENDANCE_ARCHIVE_SCHEMA, or are dropped if it is empty.
+    ATTENDANCE_PARTITIONS_AHEAD: int = 3
+    ATTENDANCE_RETENTION_MONTHS: int = 0
+    ATTENDANCE_ARCHIVE_SCHEMA: str = "attendance_archive"
+
+    # Background jobs, run in every worker but by one at a time (advisory
+    # lock). Intervals are in seconds; 0 disables a job.
+    JOBS_ENABLED: bool = True
+    JOBS_MAX_CONCURRENCY: int = 2
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = 6 * 3600
+
+    # Sessions left open longer than STALE_SESSION_MAX_HOURS are closed: at
+    # check_in ("zero", counts no time), at check_in + the limit ("cap"), or
+    # at the end of the check-in day ("end_of_day").
+    STALE_SWEEP_INTERVAL_SECONDS: float = 300.0
+    STALE_SESSION_MAX_HOURS: float = 16.0
+    STALE_SESSION_POLICY: Literal["zero", "cap", "end_of_day"] = "zero"
+    STALE_SESSION_BATCH_SIZE: int = 500
+
+    # Timesheets: overtime is time past OVERTIME_DAILY_HOURS in a day, then
+    # regular time past OVERTIME_WEEKLY_HOURS in a week (0 disables either).
+    # Night hours fall between the two NIGHT_SHIFT hours (UTC; the window may
+    # wrap past midnight).
+    OVERTIME_DAILY_HOURS: float = 8.0
+    OVERTIME_WEEKLY_HOURS: float = 40.0
+    NIGHT_SHIFT_START_HOUR: float = 22.0
+    NIGHT_SHIFT_END_HOUR: float = 6.0
+    TIMESHEET_MAX_DAYS: int = 62
+
+    # Audit log: events wait in memory (up to AUDIT_BUFFER_SIZE; more are
+    # dropped and counted) and are written in batches of AUDIT_BATCH_SIZE, at
+    # least every AUDIT_FLUSH_INTERVAL_SECONDS. A batch the database keeps
+    # rejecting is split after AUDIT_MAX_ATTEMPTS tries, down to the events
+    # at fault, which are logged and dropped.
+    AUDIT_BUFFER_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    AUDIT_MAX_ATTEMPTS: int = 3
 
     class Config:
         env_file = ".env"
         extra = "allow" # Allow extra fields for now
-        
+
 settings = Settings()
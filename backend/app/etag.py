@@ -0,0 +1,81 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+USERS_KEY = "users"
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def attendance_key(user_id: int) -> str:
+    return f"attendance:{user_id}"
+
+
+async def bump(db: AsyncSession, *keys: str) -> None:
+    """Increment version counters in the caller's transaction (it commits),
+    so readers never see new data under an old ETag."""
+    if not keys:
+        return
+    stmt = insert(models.RowVersion).values([{"key": key, "version": 1} for key in sorted(set(keys))])
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[models.RowVersion.key],
+            set_={"version": models.RowVersion.version + 1},
+        )
+    )
+
+
+def bump_over(rows, key: str):
+    """``bump`` of ``key`` as a statement to attach, as a CTE, to the write
+    whose RETURNING rows ``rows`` are: the counter moves in that same
+    statement, and only if the write touched a row."""
+    stmt = insert(models.RowVersion).from_select(
+        ["key", "version"], select(literal(key), literal(1)).select_from(rows).distinct()
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[models.RowVersion.key],
+        set_={"version": models.RowVersion.version + 1},
+    )
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b("\x1f".join(str(part) for part in parts).encode(), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+
+async def versioned_etag(db: AsyncSession, request: Request, *keys: str) -> str:
+    """ETag for a GET whose response only changes when ``keys`` are bumped.
+
+    Costs one primary-key lookup; the query string is part of the tag, so
+    every page or filter combination gets its own.
+    """
+    result = await db.execute(
+        select(models.RowVersion.key, models.RowVersion.version).filter(models.RowVersion.key.in_(keys))
+    )
+    versions = dict(result.all())
+    return make_etag(request.url.path, request.url.query, *(f"{key}={versions.get(key, 0)}" for key in keys))
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match.
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Return a 304 if the client already has ``etag``; otherwise tag ``response``."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import models
+
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_COLUMNS = [
+    "id",
+    "user_id",
+    "username",
+    "email",
+    "full_name",
+    "check_in",
+    "check_out",
+    "total_hours",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def attendance_export_query(
+    from_: Optional[datetime] = None,
+    to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+):
+    query = (
+        select(
+            models.Attendance.id,
+            models.Attendance.user_id,
+            models.User.username,
+            models.User.email,
+            models.User.full_name,
+            models.Attendance.check_in,
+            models.Attendance.check_out,
+            models.Attendance.total_hours,
+        )
+        .join(models.User, models.User.id == models.Attendance.user_id)
+        .order_by(models.Attendance.id)
+    )
+    if from_ is not None:
+        query = query.filter(models.Attendance.check_in >= from_)
+    if to is not None:
+        query = query.filter(models.Attendance.check_in < to)
+    if user_id is not None:
+        query = query.filter(models.Attendance.user_id == user_id)
+    return query
+
+
+def _format_csv(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _format_ndjson(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=datetime.isoformat) + "\n"
+        for row in rows
+    )
+
+
+async def stream_attendance(
+    engine: AsyncEngine, fmt: str, query, batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[str]:
+    """Yield the export in chunks of ``batch_size`` rows.
+
+    Rows come from a server-side cursor on a connection of ``engine`` owned by
+    the generator rather than the request's session, so memory stays flat
+    regardless of the export size and the first chunk is sent as soon as the
+    first batch arrives.
+    """
+    if fmt == "csv":
+        yield _format_csv([], header=True)
+    async with engine.connect() as conn:
+        result = await conn.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield _format_csv(rows, header=False) if fmt == "csv" else _format_ndjson(rows)
@@ -0,0 +1,121 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from passlib.context import CryptContext
+
+# Kept free of app imports: with the process pool this module is imported by
+# every worker process, which must not need the database settings.
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _warm_up() -> int:
+    # Loads the argon2 backend and pays its first-call costs in this worker.
+    pwd_context.hash("warm-up")
+    return os.getpid()
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool and its queue are both full."""
+
+
+class PasswordHasher:
+    """Runs argon2 hashing off the event loop on a bounded worker pool.
+
+    At most ``workers + queue_size`` jobs are accepted at a time; anything
+    beyond that fails fast with ``HasherBusy`` instead of piling up behind the
+    CPU-bound work.
+    """
+
+    def __init__(self, pool: str = "process", workers: int = 0, queue_size: int = 64):
+        self.pool = pool
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + queue_size
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.pool == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    @property
+    def saturated(self) -> bool:
+        return self.in_flight >= self.capacity
+
+    async def _run(self, fn, *args):
+        # Only touched from the event loop thread, so a plain counter is enough.
+        if self.saturated:
+            self.rejected += 1
+            raise HasherBusy()
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def hash_many(self, passwords: List[str], chunk_size: int = 16) -> List[str]:
+        """Hash a batch in chunks of ``chunk_size``, one pool job per chunk.
+
+        At most ``workers`` chunks are submitted at a time, so the batch keeps
+        every worker busy while single logins queued behind it wait for one
+        chunk at most rather than for the whole batch.
+        """
+        chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+        limit = asyncio.Semaphore(self.workers)
+
+        async def run_chunk(chunk):
+            async with limit:
+                return await self._run(_hash_many, chunk)
+
+        results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+        return [hashed for chunk in results for hashed in chunk]
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    async def warm_up(self) -> None:
+        """Start every worker and hash once in each, so the first real request
+        pays neither process startup nor argon2 initialization."""
+        await asyncio.gather(*(self._run(_warm_up) for _ in range(self.workers)))
+
+    def stats(self) -> dict:
+        return {
+            "pool": self.pool,
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
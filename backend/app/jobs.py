@@ -0,0 +1,126 @@
+"""In-process scheduler for periodic maintenance jobs.
+
+Every worker runs the same schedule, but a job only runs where it wins a
+Postgres advisory lock (keyed by the job name) for the length of the run, so
+N workers do not repeat the work N times. At most ``max_concurrency`` jobs
+run at once per worker, keeping them from crowding out requests for pool
+connections.
+"""
+import asyncio
+import contextlib
+import hashlib
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+JobFunction = Callable[[], Awaitable[Optional[dict]]]
+
+
+def lock_key(name: str) -> int:
+    """Stable signed 64-bit advisory lock key for a job name."""
+    return int.from_bytes(hashlib.blake2b(f"job:{name}".encode(), digest_size=8).digest(), "big", signed=True)
+
+
+class Job:
+    __slots__ = ("name", "interval", "run", "runs", "skipped", "failures", "last_seconds", "last_result")
+
+    def __init__(self, name: str, interval: float, run: JobFunction):
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_seconds = 0.0
+        self.last_result: Optional[dict] = None
+
+    def stats(self) -> dict:
+        stats = {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "last_seconds": self.last_seconds,
+        }
+        for key, value in (self.last_result or {}).items():
+            if isinstance(value, (int, float)):
+                stats[f"last_{key}"] = value
+        return stats
+
+
+class JobRunner:
+    def __init__(self, engine: AsyncEngine, max_concurrency: int = 2):
+        self.engine = engine
+        self.jobs: Dict[str, Job] = {}
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, interval: float, run: JobFunction) -> None:
+        """Run ``run`` every ``interval`` seconds; an interval of 0 disables it."""
+        if interval > 0:
+            self.jobs[name] = Job(name, interval, run)
+
+    @contextlib.asynccontextmanager
+    async def _exclusive(self, name: str):
+        """Yield whether this worker holds the job's lock. The lock is session
+        level, on a connection kept for the whole run, so jobs may commit as
+        often as they like."""
+        async with self.engine.connect() as conn:
+            key = lock_key(name)
+            locked = await conn.scalar(select(func.pg_try_advisory_lock(key)))
+            await conn.commit()
+            try:
+                yield locked
+            finally:
+                if locked:
+                    await conn.scalar(select(func.pg_advisory_unlock(key)))
+                    await conn.commit()
+
+    async def run_once(self, job: Job) -> None:
+        async with self._limit:
+            async with self._exclusive(job.name) as locked:
+                if not locked:
+                    job.skipped += 1
+                    return
+                started = time.perf_counter()
+                try:
+                    job.last_result = await job.run()
+                    job.runs += 1
+                except Exception:
+                    job.failures += 1
+                    logger.exception("Job %s failed", job.name)
+                finally:
+                    job.last_seconds = time.perf_counter() - started
+
+    async def _loop(self, job: Job) -> None:
+        # Jitter the first run so workers started together don't all race for the lock.
+        await asyncio.sleep(random.uniform(0, min(job.interval, 30.0)))
+        while True:
+            try:
+                await self.run_once(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Lock acquisition failed (database down); try again next time.
+                job.failures += 1
+                logger.exception("Could not run job %s", job.name)
+            await asyncio.sleep(job.interval)
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._loop(job), name=f"job:{job.name}") for job in self.jobs.values()]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: job.stats() for name, job in self.jobs.items()}
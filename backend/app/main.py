@@ -1,13 +1,55 @@
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+from functools import partial
+
 from fastapi import FastAPI
-from dotenv import load_dotenv
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from . import partitions, presence, startup, sweeper
+from .admission import auth_admission
+from .audit import audit_log
+from .core.config import settings
+from .db import AsyncSessionLocal, async_engine, pool_stats, read_engine, read_pool_stats
+from .jobs import JobRunner
+from .metrics import MetricsMiddleware, instrument_engine, registry, render_stats
+from .pagination import NEXT_CURSOR_HEADER
+from .replica import ReadYourWritesMiddleware
 from .routers import users, auth, admin, user
+from .security import password_hasher, principal_cache
+
+
+job_runner = JobRunner(async_engine, settings.JOBS_MAX_CONCURRENCY)
+job_runner.register(
+    "close_stale_sessions",
+    settings.STALE_SWEEP_INTERVAL_SECONDS,
+    partial(sweeper.close_stale_sessions, AsyncSessionLocal),
+)
+job_runner.register(
+    "maintain_partitions",
+    settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+    partial(partitions.maintenance_job, AsyncSessionLocal),
+)
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup.run(async_engine, read_engine)
+    presence_listener = asyncio.create_task(presence.listen())
+    audit_log.start()
+    if settings.JOBS_ENABLED:
+        job_runner.start()
+    yield
+    await job_runner.stop()
+    await audit_log.stop()
+    presence_listener.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await presence_listener
+    password_hasher.shutdown()
 
-load_dotenv()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -22,7 +64,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+app.add_middleware(MetricsMiddleware)
+instrument_engine(async_engine.sync_engine)
+if read_engine is not None:
+    app.add_middleware(ReadYourWritesMiddleware)
+    instrument_engine(read_engine.sync_engine)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    lines = registry.render()
+    lines.extend(render_stats("db_pool", pool_stats()))
+    lines.extend(render_stats("db_read_pool", read_pool_stats()))
+    lines.extend(render_stats("password_hasher", password_hasher.stats()))
+    lines.extend(render_stats("principal_cache", principal_cache.stats()))
+    lines.extend(render_stats("auth_admission", auth_admission.stats()))
+    lines.extend(render_stats("presence", presence.index.stats()))
+    lines.extend(render_stats("audit", audit_log.stats()))
+    lines.extend(render_stats("startup", startup.timings))
+    for name, stats in job_runner.stats().items():
+        lines.extend(render_stats(f"job_{name}", stats))
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 
 @app.get("/test")
 def test():
@@ -0,0 +1,161 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds in seconds; observations above the last one land in +Inf.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "unmatched"
+
+# [query count, DB seconds, start of the running query] for the current request.
+_request_db: ContextVar[Optional[List[float]]] = ContextVar("request_db", default=None)
+
+
+class RouteMetrics:
+    __slots__ = ("buckets", "count", "seconds", "statuses", "db_queries", "db_seconds")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.statuses: Dict[int, int] = {}
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, db_queries: int, db_seconds: float):
+        key = (method, route)
+        with self._lock:
+            metrics = self.routes.get(key)
+            if metrics is None:
+                metrics = self.routes[key] = RouteMetrics()
+            metrics.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            metrics.count += 1
+            metrics.seconds += seconds
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.db_queries += db_queries
+            metrics.db_seconds += db_seconds
+
+    def render(self) -> List[str]:
+        lines = [
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self.routes.items())
+            for (method, route), metrics in items:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {metrics.seconds}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+            lines.append("# TYPE http_responses_total counter")
+            for (method, route), metrics in items:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'http_responses_total{{{labels},status="{status}"}} {count}')
+            lines.append("# TYPE http_request_db_queries_total counter")
+            for (method, route), metrics in items:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                lines.append(f"http_request_db_queries_total{{{labels}}} {metrics.db_queries}")
+            lines.append("# TYPE http_request_db_seconds_total counter")
+            for (method, route), metrics in items:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                lines.append(f"http_request_db_seconds_total{{{labels}}} {metrics.db_seconds}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_stats(prefix: str, stats: dict) -> Iterable[str]:
+    """Render the numeric values of a stats() dict as gauges named prefix_key."""
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"# TYPE {prefix}_{key} gauge"
+            yield f"{prefix}_{key} {value}"
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and DB usage per route.
+
+    Routes are labelled by their path template (e.g. ``/admin/users/{user_id}``)
+    so the number of series stays bounded by the number of routes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[object, str] = {}
+
+    def _route_path(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            else:
+                path = UNMATCHED_ROUTE
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        db_stats = [0, 0.0, 0.0]
+        token = _request_db.set(db_stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            registry.observe(
+                scope["method"], self._route_path(scope), status_code, elapsed, int(db_stats[0]), db_stats[1]
+            )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attribute statements executed on ``engine`` to the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        db_stats = _request_db.get()
+        if db_stats is not None:
+            db_stats[2] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        db_stats = _request_db.get()
+        if db_stats is not None:
+            db_stats[0] += 1
+            db_stats[1] += time.perf_counter() - db_stats[2]
@@ -1,2 +1,5 @@
 from .user import User
-from .attendance import Attendance
\ No newline at end of file
+from .attendance import Attendance, AttendanceOpen
+from .rollup import AttendanceDailyRollup, AttendanceWeeklyRollup
+from .version import RowVersion
+from .audit import AuditEvent
@@ -1,14 +1,134 @@
-from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey, Index, event
 from sqlalchemy.orm import relationship
 from ..db import Base
 
 class Attendance(Base):
+    """Sessions, partitioned by month of check_in (see ``app.partitions``).
+
+    Matches migration c4d81e6a7f20, so databases built with ``create_all``
+    get the same table, default partition, triggers and partition function.
+    """
+
     __tablename__ = "attendance"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    check_in = Column(DateTime, nullable=True)
+    # Part of the primary key, as the partition key must be.
+    check_in = Column(DateTime, primary_key=True)
     check_out = Column(DateTime, nullable=True)
     total_hours = Column(Float, default=0.0)
 
     user = relationship("User")
+
+    __table_args__ = (
+        # Serves the per-user history queries (last10, admin attendance).
+        Index("ix_attendance_user_id_check_in", user_id, check_in.desc()),
+        # Finds a user's open session. It cannot be unique on a partitioned
+        # table; at most one open session per user is kept by attendance_open.
+        Index("ix_attendance_user_id_open", user_id, postgresql_where=check_out.is_(None)),
+        {"postgresql_partition_by": "RANGE (check_in)"},
+    )
+
+
+class AttendanceOpen(Base):
+    """The open session of each user, maintained by the triggers below. Its
+    primary key is what allows only one: check-in's INSERT ... ON CONFLICT DO
+    NOTHING RETURNING comes back empty when the BEFORE INSERT trigger finds
+    the user already here and skips the row."""
+
+    __tablename__ = "attendance_open"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    attendance_id = Column(Integer, nullable=False)
+    check_in = Column(DateTime, nullable=False)
+
+
+# The partitioning objects the ORM cannot declare. Migration c4d81e6a7f20
+# runs these same statements, so a database built from the models and one
+# built by the migrations cannot drift apart. They are all CREATE OR REPLACE:
+# a later migration that changes one re-runs it after editing it here.
+DEFAULT_PARTITION_DDL = "CREATE TABLE attendance_default PARTITION OF attendance DEFAULT"
+
+OPEN_SESSION_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION attendance_open_before_insert() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.check_out IS NULL THEN
+            INSERT INTO attendance_open (user_id, attendance_id, check_in)
+            VALUES (NEW.user_id, NEW.id, NEW.check_in)
+            ON CONFLICT (user_id) DO NOTHING;
+            IF NOT FOUND THEN
+                RETURN NULL;
+            END IF;
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION attendance_open_after_close() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM attendance_open WHERE user_id = OLD.user_id AND attendance_id = OLD.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER attendance_open_insert BEFORE INSERT ON attendance
+        FOR EACH ROW WHEN (NEW.user_id IS NOT NULL)
+        EXECUTE FUNCTION attendance_open_before_insert()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER attendance_open_update AFTER UPDATE OF check_out ON attendance
+        FOR EACH ROW WHEN (OLD.check_out IS NULL AND NEW.check_out IS NOT NULL)
+        EXECUTE FUNCTION attendance_open_after_close()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER attendance_open_delete AFTER DELETE ON attendance
+        FOR EACH ROW WHEN (OLD.check_out IS NULL)
+        EXECUTE FUNCTION attendance_open_after_close()
+    """,
+)
+
+# Creates the partition for the month containing `month`, first moving any
+# rows that landed in attendance_default while it was missing. Returns the
+# partition name, or NULL if it already existed.
+CREATE_PARTITION_DDL = """
+CREATE OR REPLACE FUNCTION attendance_create_partition(month date) RETURNS text AS $$
+DECLARE
+    start_at timestamp := date_trunc('month', month);
+    end_at timestamp := date_trunc('month', month) + interval '1 month';
+    partition_name text := 'attendance_y' || to_char(start_at, 'YYYY') || 'm' || to_char(start_at, 'MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE attendance INCLUDING DEFAULTS)', partition_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM attendance_default WHERE check_in >= %L AND check_in < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        start_at, end_at, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE attendance ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_at, end_at
+    );
+    -- The DELETE above released the open-session markers of moved rows.
+    EXECUTE format(
+        'INSERT INTO attendance_open (user_id, attendance_id, check_in) '
+        'SELECT user_id, id, check_in FROM %I WHERE check_out IS NULL AND user_id IS NOT NULL '
+        'ON CONFLICT (user_id) DO NOTHING',
+        partition_name
+    );
+    RETURN partition_name;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+@event.listens_for(Attendance.__table__, "after_create")
+def _create_partitioning(target, connection, **kw):
+    # One statement per call: asyncpg prepares each, and a prepared statement
+    # cannot hold several. Run raw, since the functions use % themselves.
+    for statement in (DEFAULT_PARTITION_DDL, *OPEN_SESSION_DDL, CREATE_PARTITION_DDL):
+        connection.exec_driver_sql(statement)
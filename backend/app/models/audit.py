@@ -0,0 +1,23 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from ..db import Base
+
+class AuditEvent(Base):
+    __tablename__ = "audit_log"
+
+    id = Column(BigInteger, primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+    action = Column(String, nullable=False)
+    # No foreign keys: the trail must outlive the users it mentions.
+    actor_id = Column(Integer, nullable=True)
+    actor_username = Column(String, nullable=True)
+    target_id = Column(Integer, nullable=True)
+    client_ip = Column(String, nullable=True)
+    details = Column(JSONB, nullable=True)
+
+    __table_args__ = (
+        # Newest-first pages, optionally narrowed to one actor or target.
+        Index("ix_audit_log_actor_id_id", actor_id, id.desc()),
+        Index("ix_audit_log_target_id_id", target_id, id.desc()),
+        Index("ix_audit_log_action_id", action, id.desc()),
+    )
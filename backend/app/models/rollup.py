@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, Date, Float, ForeignKey, Index
+from ..db import Base
+
+class AttendanceDailyRollup(Base):
+    __tablename__ = "attendance_daily_rollup"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    total_hours = Column(Float, nullable=False, default=0.0)
+    sessions = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_attendance_daily_rollup_day", day),
+    )
+
+
+class AttendanceWeeklyRollup(Base):
+    __tablename__ = "attendance_weekly_rollup"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    total_hours = Column(Float, nullable=False, default=0.0)
+    sessions = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_attendance_weekly_rollup_week_start", week_start),
+    )
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, BigInteger
+from ..db import Base
+
+class RowVersion(Base):
+    __tablename__ = "row_versions"
+
+    # "users" for the users table, "attendance:<user_id>" for one user's sessions.
+    key = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,100 @@
+import base64
+import binascii
+import json
+from typing import Literal, Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, tuple_
+
+from app import models
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+UserOrder = Literal["id", "username"]
+
+
+def _is_int(bits: int):
+    def check(value) -> bool:
+        return isinstance(value, int) and not isinstance(value, bool) and -(2 ** (bits - 1)) <= value < 2 ** (bits - 1)
+
+    return check
+
+
+def _is_str(value) -> bool:
+    return isinstance(value, str)
+
+
+# Checks for the values a cursor carries under each ordering, matching the
+# column types they are compared with.
+CURSOR_SHAPES = {
+    "id": (_is_int(32),),
+    "username": (_is_str, _is_int(32)),
+    "audit": (_is_int(64),),
+}
+
+
+def encode_cursor(order_by: str, values: list) -> str:
+    payload = json.dumps({"o": order_by, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["o"] != order_by:
+            raise ValueError("cursor was issued for a different ordering")
+        values = payload["v"]
+        # Cursors come back from clients; a well-encoded one with the wrong
+        # values must not reach the query.
+        shape = CURSOR_SHAPES[order_by]
+        if not isinstance(values, list) or len(values) != len(shape):
+            raise ValueError("cursor has the wrong number of values")
+        if not all(check(value) for value, check in zip(values, shape)):
+            raise ValueError("cursor value has the wrong type")
+        return values
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _sort_key(user: models.User, order_by: str) -> list:
+    if order_by == "username":
+        return [user.username, user.id]
+    return [user.id]
+
+
+def paginate_users(
+    query: Select,
+    order_by: str = "id",
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Select:
+    """Order a users query and apply either a keyset cursor or skip/limit.
+
+    With a cursor the page starts right after the row it encodes, so the cost
+    does not depend on how deep into the list the client is.
+    """
+    if order_by == "username":
+        query = query.order_by(models.User.username, models.User.id)
+    else:
+        query = query.order_by(models.User.id)
+
+    if cursor is not None:
+        values = decode_cursor(cursor, order_by)
+        if order_by == "username":
+            query = query.filter(tuple_(models.User.username, models.User.id) > tuple_(*values))
+        else:
+            query = query.filter(models.User.id > values[0])
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def set_next_cursor(response: Response, users: list, order_by: str, limit: int) -> None:
+    """Expose the cursor of the following page, if there may be one, as a header.
+
+    Kept out of the body so both endpoints still return a plain list.
+    """
+    if users and len(users) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(order_by, _sort_key(users[-1], order_by))
@@ -0,0 +1,122 @@
+"""Monthly partitions of ``attendance`` (see migration c4d81e6a7f20).
+
+Partitions are named ``attendance_yYYYYmMM`` and cover one calendar month of
+``check_in``; rows outside every partition fall into ``attendance_default``.
+Maintenance creates partitions ahead of time and, with a retention set,
+detaches the ones that have aged out, either moving them to an archive
+schema or dropping them. Rollups are kept in their own tables and are not
+affected, but ``rollups.rebuild`` only sees attendance that is still attached.
+
+Databases built from the models (``create_all``, as the tests do) get the same
+partitioned table, starting out with only the default partition.
+"""
+import re
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+PARTITION_PATTERN = re.compile(r"^attendance_y(\d{4})m(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"attendance_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    match = PARTITION_PATTERN.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def expired(partitions: Dict[date, str], today: date, retention_months: int) -> List[str]:
+    """Partitions whose whole month is older than ``retention_months`` full
+    months before the current one. A retention of 0 keeps everything."""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today), -retention_months)
+    return [name for month, name in sorted(partitions.items()) if month < cutoff]
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    result = await db.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('attendance')")
+    )
+    return result.first() is not None
+
+
+async def list_partitions(db: AsyncSession) -> Dict[date, str]:
+    result = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'attendance'::regclass"
+        )
+    )
+    partitions = {}
+    for (name,) in result:
+        month = partition_month(name)
+        if month is not None:
+            partitions[month] = name
+    return partitions
+
+
+async def ensure_partitions(db: AsyncSession, today: date, ahead: int) -> List[str]:
+    """Create any missing partitions from this month to ``ahead`` months out."""
+    created = []
+    for offset in range(ahead + 1):
+        result = await db.execute(
+            text("SELECT attendance_create_partition(:month)"),
+            {"month": add_months(month_start(today), offset)},
+        )
+        name = result.scalar()
+        if name is not None:
+            created.append(name)
+    return created
+
+
+async def detach_partition(db: AsyncSession, name: str, archive_schema: Optional[str]) -> None:
+    month = partition_month(name)
+    # Sessions left open that long ago must not block their users' check-ins.
+    await db.execute(
+        text("DELETE FROM attendance_open WHERE check_in >= :start AND check_in < :end"),
+        {"start": month, "end": add_months(month, 1)},
+    )
+    await db.execute(text(f'ALTER TABLE attendance DETACH PARTITION "{name}"'))
+    if archive_schema:
+        await db.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"'))
+        await db.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{archive_schema}"'))
+    else:
+        await db.execute(text(f'DROP TABLE "{name}"'))
+
+
+async def maintain(db: AsyncSession, today: Optional[date] = None) -> Dict[str, List[str]]:
+    """Create upcoming partitions and retire expired ones. The caller commits."""
+    result = {"created": [], "archived": [], "dropped": []}
+    if not await is_partitioned(db):
+        return result
+    today = today or datetime.utcnow().date()
+    result["created"] = await ensure_partitions(db, today, settings.ATTENDANCE_PARTITIONS_AHEAD)
+    archive_schema = settings.ATTENDANCE_ARCHIVE_SCHEMA or None
+    for name in expired(await list_partitions(db), today, settings.ATTENDANCE_RETENTION_MONTHS):
+        await detach_partition(db, name, archive_schema)
+        result["archived" if archive_schema else "dropped"].append(name)
+    return result
+
+
+async def maintenance_job(session_factory: Callable[[], AsyncSession]) -> Dict[str, int]:
+    """``maintain`` in its own transaction, for the background job runner."""
+    async with session_factory() as db:
+        result = await maintain(db)
+        await db.commit()
+    return {action: len(names) for action, names in result.items()}
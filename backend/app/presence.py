@@ -0,0 +1,173 @@
+"""Who is checked in right now, pushed to admin dashboards.
+
+Check-in/check-out publish a Postgres NOTIFY inside their transaction, so the
+event is delivered to every worker when (and only if) the write commits. Each
+worker keeps the index in memory, rebuilt from open attendance rows whenever
+its listener (re)connects, and fans changes out to its SSE subscribers.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+
+import asyncpg
+from sqlalchemy import ARRAY, Text, func, literal, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.config import settings
+from app.db import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+CHECK_IN = "check_in"
+CHECK_OUT = "check_out"
+SNAPSHOT = "snapshot"
+
+
+class PresenceIndex:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.present: Dict[int, datetime] = {}
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.dropped = 0
+        self._pending: Optional[list] = None
+
+    def snapshot(self) -> dict:
+        return {
+            "present": [
+                {"user_id": user_id, "check_in": check_in.isoformat()}
+                for user_id, check_in in sorted(self.present.items())
+            ]
+        }
+
+    def apply(self, event: str, user_id: int, check_in: Optional[datetime] = None) -> None:
+        if self._pending is not None:
+            self._pending.append((event, user_id, check_in))
+        if event == CHECK_IN:
+            if self.present.get(user_id) == check_in:
+                return
+            self.present[user_id] = check_in
+            self._broadcast(CHECK_IN, {"user_id": user_id, "check_in": check_in.isoformat()})
+        elif event == CHECK_OUT:
+            if self.present.pop(user_id, None) is None:
+                return
+            self._broadcast(CHECK_OUT, {"user_id": user_id})
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """Reload from open sessions, keeping events that arrive meanwhile."""
+        self._pending = []
+        try:
+            result = await db.execute(
+                select(models.Attendance.user_id, models.Attendance.check_in).filter(
+                    models.Attendance.check_out.is_(None)
+                )
+            )
+            rows = result.all()
+        finally:
+            pending, self._pending = self._pending, None
+        self.present = {user_id: check_in for user_id, check_in in rows if user_id is not None}
+        for event in pending:
+            self.apply(*event)
+        self._broadcast(SNAPSHOT, self.snapshot())
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        queue.put_nowait((SNAPSHOT, self.snapshot()))
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def _broadcast(self, event: str, data: dict) -> None:
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # A slow client gets a fresh snapshot instead of a gap.
+                self.dropped += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((SNAPSHOT, self.snapshot()))
+
+    def stats(self) -> dict:
+        return {"present": len(self.present), "subscribers": len(self.subscribers), "dropped": self.dropped}
+
+
+index = PresenceIndex(queue_size=settings.PRESENCE_QUEUE_SIZE)
+
+
+async def stream(heartbeat_seconds: float = 15.0) -> AsyncIterator[str]:
+    """Server-sent events: a snapshot, then check-in/check-out deltas, with
+    comment heartbeats so proxies keep the connection open."""
+    queue = index.subscribe()
+    try:
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    finally:
+        index.unsubscribe(queue)
+
+
+def _payload(event: str, user_id: int, check_in: Optional[datetime] = None) -> str:
+    payload = {"e": event, "u": user_id}
+    if check_in is not None:
+        payload["t"] = check_in.isoformat()
+    return json.dumps(payload)
+
+
+def notify(event: str, user_id: int, check_in: Optional[datetime] = None):
+    """A pg_notify() call to select over the RETURNING rows of the write it
+    announces, so the NOTIFY rides in the same statement (and transaction:
+    it is delivered on commit) and only fires if a row was written."""
+    return func.pg_notify(settings.PRESENCE_CHANNEL, _payload(event, user_id, check_in)).label("notified")
+
+
+async def publish_many(db: AsyncSession, event: str, user_ids: Iterable[int]) -> None:
+    """Queue NOTIFYs for many users in the caller's transaction, in one statement."""
+    payloads = [_payload(event, user_id) for user_id in user_ids]
+    if not payloads:
+        return
+    payload = func.unnest(literal(payloads, ARRAY(Text))).column_valued("payload")
+    await db.execute(select(func.pg_notify(settings.PRESENCE_CHANNEL, payload)))
+
+
+def _on_notification(connection, pid, channel, payload) -> None:
+    try:
+        message = json.loads(payload)
+        check_in = datetime.fromisoformat(message["t"]) if "t" in message else None
+        index.apply(message["e"], message["u"], check_in)
+    except (ValueError, KeyError):
+        logger.warning("Ignoring malformed presence notification: %r", payload)
+
+
+async def listen(retry_seconds: float = 5.0) -> None:
+    """Keep a LISTEN connection open for the life of the app, reconnecting
+    (and rebuilding the index) whenever it drops."""
+    dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            await connection.add_listener(settings.PRESENCE_CHANNEL, _on_notification)
+            async with AsyncSessionLocal() as db:
+                await index.rebuild(db)
+            await closed.wait()
+            logger.warning("Presence listener connection closed, reconnecting")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Presence listener failed, retrying in %.0fs", retry_seconds)
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(retry_seconds)
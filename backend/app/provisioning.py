@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import etag, models, schemas
+from app.security import get_password_hashes_async
+
+INSERT_CHUNK_SIZE = 1000
+
+# Unique indexes on users and the 400 each violation has always produced.
+USER_CONFLICTS = {
+    "ix_users_email": "Email already registered",
+    "ix_users_username": "Username already registered",
+}
+
+UNIQUE_VIOLATION = "23505"
+
+
+def user_conflict_detail(exc: IntegrityError) -> Optional[str]:
+    """The error message for a unique violation on users, or None if ``exc`` is
+    some other integrity error."""
+    if getattr(exc.orig, "sqlstate", None) != UNIQUE_VIOLATION:
+        return None
+    # asyncpg's own exception (with the constraint name) is the DBAPI error's cause.
+    return USER_CONFLICTS.get(getattr(exc.orig.__cause__, "constraint_name", None))
+
+
+async def _taken_detail(
+    db: AsyncSession, username: str, email: str, exclude_id: Optional[int] = None
+) -> Optional[str]:
+    """The 400 for ``username``/``email`` clashing with existing accounts,
+    email first, or None if neither does (any more)."""
+    query = select(models.User.username, models.User.email).filter(
+        or_(models.User.email == email, models.User.username == username)
+    )
+    if exclude_id is not None:
+        query = query.filter(models.User.id != exclude_id)
+    taken = (await db.execute(query)).all()
+    if any(existing_email == email for _, existing_email in taken):
+        return "Email already registered"
+    if taken:
+        return "Username already registered"
+    return None
+
+
+async def write_user(
+    db: AsyncSession, stmt, username: str, email: str, exclude_id: Optional[int] = None
+) -> Optional[RowMapping]:
+    """Execute a users INSERT/UPDATE/DELETE ... RETURNING and return its row,
+    bumping the users version in the same statement if a row was written.
+
+    Uniqueness is left to the database: rather than looking up the username
+    and email first, a violation is rolled back and reported as a 400. Only
+    then are the clashing accounts looked up, so the message does not depend
+    on which index Postgres happened to check first (email wins, as it always
+    has).
+    """
+    written = stmt.cte("written")
+    try:
+        result = await db.execute(
+            select(*written.c).add_cte(etag.bump_over(written, etag.USERS_KEY).cte("bumped"))
+        )
+    except IntegrityError as exc:
+        await db.rollback()
+        detail = user_conflict_detail(exc)
+        if detail is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=await _taken_detail(db, username, email, exclude_id) or detail,
+        )
+    return result.mappings().one_or_none()
+
+
+def parse_rows(body: bytes, content_type: str) -> List[dict]:
+    """Read a bulk import body: a JSON array of users, or CSV with a header row."""
+    try:
+        if content_type.startswith("text/csv"):
+            reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+            # Empty CSV cells mean "not provided", like a missing JSON key.
+            return [{key: value or None for key, value in row.items()} for row in reader]
+        rows = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed import body")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of users")
+    return rows
+
+
+def _error(index: int, username: Optional[str], detail: str) -> schemas.BulkImportRow:
+    return schemas.BulkImportRow(row=index, username=username, status="error", detail=detail)
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+async def import_users(db: AsyncSession, rows: List[dict]) -> schemas.BulkImportResult:
+    """Validate, de-duplicate, hash and insert a batch of users.
+
+    Every row gets an entry in the report. Rows that fail are skipped without
+    affecting the others; the successful rows are committed together.
+    """
+    report: List[Optional[schemas.BulkImportRow]] = [None] * len(rows)
+    valid: List[Tuple[int, schemas.UserCreate]] = []
+    seen_usernames, seen_emails = set(), set()
+
+    for index, raw in enumerate(rows):
+        username = raw.get("username") if isinstance(raw, dict) else None
+        try:
+            user = schemas.UserCreate.model_validate(raw)
+        except ValidationError as exc:
+            report[index] = _error(index, username, _validation_detail(exc))
+            continue
+        if user.username in seen_usernames:
+            report[index] = _error(index, user.username, "Duplicate username in batch")
+        elif user.email in seen_emails:
+            report[index] = _error(index, user.username, "Duplicate email in batch")
+        else:
+            seen_usernames.add(user.username)
+            seen_emails.add(user.email)
+            valid.append((index, user))
+
+    # One set-based lookup for clashes with existing accounts.
+    if valid:
+        result = await db.execute(
+            select(models.User.username, models.User.email).filter(
+                or_(
+                    models.User.username.in_([user.username for _, user in valid]),
+                    models.User.email.in_([user.email for _, user in valid]),
+                )
+            )
+        )
+        taken_usernames, taken_emails = set(), set()
+        for existing_username, existing_email in result:
+            taken_usernames.add(existing_username)
+            taken_emails.add(existing_email)
+        remaining = []
+        for index, user in valid:
+            if user.email in taken_emails:
+                report[index] = _error(index, user.username, "Email already registered")
+            elif user.username in taken_usernames:
+                report[index] = _error(index, user.username, "Username already registered")
+            else:
+                remaining.append((index, user))
+        valid = remaining
+
+    hashed_passwords = await get_password_hashes_async([user.password for _, user in valid])
+    values = [
+        {
+            "username": user.username,
+            "email": user.email,
+            "full_name": user.full_name,
+            "hashed_password": hashed_password,
+            "role": "user",
+        }
+        for (_, user), hashed_password in zip(valid, hashed_passwords)
+    ]
+
+    created_ids = {}
+    for start in range(0, len(values), INSERT_CHUNK_SIZE):
+        # DO NOTHING covers accounts created concurrently since the lookup above;
+        # those rows simply come back missing from RETURNING.
+        created = (
+            insert(models.User)
+            .values(values[start:start + INSERT_CHUNK_SIZE])
+            .on_conflict_do_nothing()
+            .returning(models.User.id, models.User.username)
+            .cte("created")
+        )
+        result = await db.execute(
+            select(*created.c).add_cte(etag.bump_over(created, etag.USERS_KEY).cte("bumped"))
+        )
+        created_ids.update({username: user_id for user_id, username in result})
+    await db.commit()
+
+    for index, user in valid:
+        if user.username in created_ids:
+            report[index] = schemas.BulkImportRow(
+                row=index, username=user.username, status="created", id=created_ids[user.username]
+            )
+        else:
+            report[index] = _error(index, user.username, "User already registered")
+
+    created = len(created_ids)
+    return schemas.BulkImportResult(created=created, failed=len(rows) - created, results=report)
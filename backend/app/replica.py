@@ -0,0 +1,71 @@
+"""Read-your-writes for replica routing.
+
+With READ_DATABASE_URL set, ``get_read_db`` serves reads from the replica,
+except for a client that has just written: for READ_YOUR_WRITES_SECONDS after
+a successful mutation its reads go to the primary, so it never sees the
+replica lag behind its own change. Clients are recognized by token subject
+(or address, before login) on this worker, and by a short-lived cookie on the
+others.
+"""
+from typing import Optional
+
+from jose import JWTError, jwt
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from app.cache import TTLCache
+from app.core.config import settings
+
+READ_PRIMARY_COOKIE = "read_primary"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+recent_writers = TTLCache(max_size=100_000, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+
+def client_key(connection: HTTPConnection) -> Optional[str]:
+    authorization = connection.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        # Unverified is enough: a forged subject only sends reads to the primary.
+        try:
+            subject = jwt.get_unverified_claims(token).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+    return f"ip:{connection.client.host}" if connection.client else None
+
+
+def wrote_recently(connection: HTTPConnection) -> bool:
+    if READ_PRIMARY_COOKIE in connection.cookies:
+        return True
+    key = client_key(connection)
+    return key is not None and recent_writers.get(key) is not None
+
+
+class ReadYourWritesMiddleware:
+    """Remember clients whose mutating requests succeeded."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                connection = HTTPConnection(scope)
+                key = client_key(connection)
+                if key is not None:
+                    recent_writers.set(key, True)
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{READ_PRIMARY_COOKIE}=1; Max-Age={max(1, round(settings.READ_YOUR_WRITES_SECONDS))}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,166 @@
+"""Per-user daily and weekly attendance totals.
+
+The rollup tables are maintained incrementally as sessions are closed and can
+be rebuilt from ``attendance`` at any time. Days are UTC calendar days (the
+timestamps are stored as naive UTC) and weeks start on Monday, matching
+Postgres ``date_trunc('week', ...)``. A session's hours are split across the
+days it spans; it is counted as one session on the day it started.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import Date, Float, Integer, case, cast, column, func, literal, or_, select, text, true, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+Session = Tuple[int, datetime, datetime]
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def split_by_day(check_in: datetime, check_out: datetime) -> List[Tuple[date, float]]:
+    """Hours of the session falling on each calendar day it touches."""
+    chunks = []
+    day = check_in.date()
+    while True:
+        day_start = datetime.combine(day, time.min)
+        day_end = day_start + timedelta(days=1)
+        start = max(check_in, day_start)
+        end = min(check_out, day_end)
+        if end > start or day == check_in.date():
+            chunks.append((day, max((end - start).total_seconds(), 0.0) / 3600))
+        if check_out <= day_end:
+            return chunks
+        day += timedelta(days=1)
+
+
+def aggregate(sessions: Iterable[Session]):
+    """Fold closed sessions into {(user_id, day): [hours, sessions]} buckets."""
+    daily: Dict[Tuple[int, date], List[float]] = defaultdict(lambda: [0.0, 0])
+    weekly: Dict[Tuple[int, date], List[float]] = defaultdict(lambda: [0.0, 0])
+    for user_id, check_in, check_out in sessions:
+        if user_id is None or check_in is None or check_out is None:
+            continue
+        for day, hours in split_by_day(check_in, check_out):
+            started = 1 if day == check_in.date() else 0
+            daily[(user_id, day)][0] += hours
+            daily[(user_id, day)][1] += started
+            weekly[(user_id, week_start(day))][0] += hours
+            weekly[(user_id, week_start(day))][1] += started
+    return daily, weekly
+
+
+def _upsert(model, period_column: str, buckets):
+    # Rows come from a VALUES list rather than a multi-row insert so two
+    # upserts can share one statement without their parameter names clashing.
+    rows = values(
+        column("user_id", Integer),
+        column(period_column, Date),
+        column("total_hours", Float),
+        column("sessions", Integer),
+        name=f"{model.__table__.name}_rows",
+    ).data([(user_id, period, hours, count) for (user_id, period), (hours, count) in buckets.items()])
+    return _upsert_from(model, period_column, select(rows))
+
+
+def _upsert_from(model, period_column: str, rows):
+    """Add (user_id, period, total_hours, sessions) ``rows`` to a rollup table."""
+    table = model.__table__
+    stmt = insert(table).from_select(["user_id", period_column, "total_hours", "sessions"], rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c[period_column]],
+        set_={
+            "total_hours": table.c.total_hours + stmt.excluded.total_hours,
+            "sessions": table.c.sessions + stmt.excluded.sessions,
+        },
+    )
+
+
+async def apply_sessions(db: AsyncSession, sessions: Iterable[Session]) -> None:
+    """Add closed sessions to the rollups. The caller commits, so the rollup
+    changes land in the same transaction as the sessions themselves."""
+    daily, weekly = aggregate(sessions)
+    if not daily:
+        return
+    daily_upsert = _upsert(models.AttendanceDailyRollup, "day", daily).cte("daily_upsert")
+    await db.execute(_upsert(models.AttendanceWeeklyRollup, "week_start", weekly).add_cte(daily_upsert))
+
+
+def upserts_over(sessions) -> list:
+    """``apply_sessions`` in SQL, for closed sessions that only exist inside a
+    statement: CTEs adding the rows of ``sessions`` (a CTE with user_id,
+    check_in and check_out, e.g. over an UPDATE ... RETURNING) to both
+    rollups, to attach with ``add_cte``. Days are split as in
+    REBUILD_DAILY_SQL and ``split_by_day``."""
+    one_day = literal(timedelta(days=1))
+    first_day = func.date_trunc("day", sessions.c.check_in)
+    days = (
+        func.generate_series(first_day, sessions.c.check_out, one_day)
+        .table_valued("day")
+        .render_derived(name="days")
+        .lateral()
+    )
+    start = func.greatest(sessions.c.check_in, days.c.day)
+    end = func.least(sessions.c.check_out, days.c.day + one_day)
+    pieces = (
+        select(
+            sessions.c.user_id,
+            days.c.day,
+            func.greatest(func.extract("epoch", end - start) / 3600.0, 0.0).label("total_hours"),
+            case((days.c.day == first_day, 1), else_=0).label("sessions"),
+        )
+        .select_from(sessions)
+        .join(days, true())
+        .filter(or_(end > start, days.c.day == first_day))
+        .cte(f"{sessions.name}_days")
+    )
+    daily = select(pieces.c.user_id, cast(pieces.c.day, Date), pieces.c.total_hours, pieces.c.sessions)
+    week = cast(func.date_trunc("week", pieces.c.day), Date)
+    weekly = select(
+        pieces.c.user_id, week, func.sum(pieces.c.total_hours), func.sum(pieces.c.sessions)
+    ).group_by(pieces.c.user_id, week)
+    return [
+        _upsert_from(models.AttendanceDailyRollup, "day", daily).cte(f"{sessions.name}_daily"),
+        _upsert_from(models.AttendanceWeeklyRollup, "week_start", weekly).cte(f"{sessions.name}_weekly"),
+    ]
+
+
+REBUILD_DAILY_SQL = """
+INSERT INTO attendance_daily_rollup (user_id, day, total_hours, sessions)
+SELECT a.user_id,
+       d.day::date,
+       SUM(EXTRACT(EPOCH FROM LEAST(a.check_out, d.day + INTERVAL '1 day')
+                            - GREATEST(a.check_in, d.day)) / 3600.0),
+       COUNT(*) FILTER (WHERE d.day = date_trunc('day', a.check_in))
+FROM attendance a
+CROSS JOIN LATERAL generate_series(date_trunc('day', a.check_in), a.check_out, INTERVAL '1 day') AS d(day)
+WHERE a.user_id IS NOT NULL
+  AND a.check_in IS NOT NULL
+  AND a.check_out IS NOT NULL
+  AND (LEAST(a.check_out, d.day + INTERVAL '1 day') > GREATEST(a.check_in, d.day)
+       OR d.day = date_trunc('day', a.check_in))
+GROUP BY a.user_id, d.day
+"""
+
+REBUILD_WEEKLY_SQL = """
+INSERT INTO attendance_weekly_rollup (user_id, week_start, total_hours, sessions)
+SELECT user_id, date_trunc('week', day)::date, SUM(total_hours), SUM(sessions)
+FROM attendance_daily_rollup
+GROUP BY user_id, date_trunc('week', day)
+"""
+
+
+async def rebuild(db: AsyncSession) -> None:
+    """Recompute both rollup tables from ``attendance``. The caller commits.
+
+    TRUNCATE locks the rollups until commit, so check-outs racing the rebuild
+    wait and then apply on top of it rather than being lost.
+    """
+    await db.execute(text("TRUNCATE attendance_daily_rollup, attendance_weekly_rollup"))
+    await db.execute(text(REBUILD_DAILY_SQL))
+    await db.execute(text(REBUILD_WEEKLY_SQL))
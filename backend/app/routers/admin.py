@@ -1,101 +1,434 @@
-from typing import List
+from datetime import date, datetime
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, delete, func, insert, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import models, schemas
-from app.db import get_db
+from app import audit, etag, export, models, presence, provisioning, rollups, schemas, search, timesheet
+from app.audit import audit_log
+from app.core.config import settings
+from app.db import get_db, get_read_db, pool_stats
 from app.dependencies import get_current_active_admin_user
+from app.pagination import NEXT_CURSOR_HEADER, UserOrder, decode_cursor, encode_cursor, paginate_users, set_next_cursor
+from app.serialization import columns_for, list_response
+from app.security import get_password_hash_async, invalidate_principal, principal_cache
 
 router = APIRouter()
 
+ATTENDANCE_PAGE_MAX = 1000
+USER_SEARCH_MAX = 100
+RECENT_ATTENDANCE_MAX_USERS = 500
+RECENT_ATTENDANCE_MAX_PER_USER = 100
+AUDIT_PAGE_MAX = 500
+
 
 @router.get("/users", response_model=List[schemas.User])
-def read_users(
-    db: Session = Depends(get_db),
+async def read_users(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    order_by: UserOrder = "id",
     current_user: models.User = Depends(get_current_active_admin_user),
 ):
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    tag = await etag.versioned_etag(db, request, etag.USERS_KEY)
+    cached = etag.not_modified(request, response, tag)
+    if cached:
+        return cached
+    result = await db.execute(
+        paginate_users(select(*columns_for(models.User, schemas.User)), order_by, cursor, skip, limit)
+    )
+    users = result.all()
+    set_next_cursor(response, users, order_by, limit)
+    return list_response(response, users, schemas.User)
+
+
+@router.get("/users/search", response_model=List[schemas.User])
+async def search_users(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100, description="Prefix or substring of username, email or full name"),
+    limit: int = Query(20, ge=1, le=USER_SEARCH_MAX),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    result = await db.execute(search.search_users(q, limit))
+    return list_response(response, result.all(), schemas.User)
 
 
 @router.post("/users", response_model=schemas.User)
-def create_user(
+async def create_user(
     user: schemas.UserCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_admin_user),
-):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    from app.security import get_password_hash
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(
-        username=user.username,
-        email=user.email,
-        full_name=user.full_name,
-        hashed_password=hashed_password,
-        role=user.role if hasattr(user, 'role') else 'user',
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    # Read before the commit expires the principal.
+    actor = audit.actor_of(current_user)
+    hashed_password = await get_password_hash_async(user.password)
+    db_user = await provisioning.write_user(
+        db,
+        insert(models.User)
+        .values(
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            hashed_password=hashed_password,
+            role=user.role if hasattr(user, 'role') else 'user',
+        )
+        .returning(*columns_for(models.User, schemas.User)),
+        user.username,
+        user.email,
+    )
+    await db.commit()
+    audit_log.record(
+        audit.USER_CREATE, request, actor, db_user["id"], {"username": db_user["username"]}
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
     return db_user
 
 
+@router.post(
+    "/users/bulk",
+    response_model=schemas.BulkImportResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": schemas.UserCreate.model_json_schema()}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def bulk_create_users(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    """Create many users from a JSON array or a CSV file with a header row
+    (username,email,full_name,password), reporting the outcome of every row."""
+    actor = audit.actor_of(current_user)
+    rows = provisioning.parse_rows(await request.body(), request.headers.get("content-type", ""))
+    if len(rows) > settings.BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_IMPORT_MAX_ROWS} users per import",
+        )
+    report = await provisioning.import_users(db, rows)
+    for row in report.results:
+        if row.status == "created":
+            audit_log.record(audit.USER_CREATE, request, actor, row.id, {"username": row.username, "bulk": True})
+    return report
+
+
 @router.put("/users/{user_id}", response_model=schemas.User)
-def update_user(
+async def update_user(
     user_id: int,
     user: schemas.UserCreate,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_admin_user),
 ):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
-
+    actor = audit.actor_of(current_user)
     # Update user fields
     update_data = user.dict(exclude_unset=True)
     if "password" in update_data:
-        from app.security import get_password_hash
-        update_data["hashed_password"] = get_password_hash(update_data["password"])
+        update_data["hashed_password"] = await get_password_hash_async(update_data["password"])
         del update_data["password"]
 
-    for key, value in update_data.items():
-        setattr(db_user, key, value)
+    # Joining the row's pre-update snapshot lets RETURNING report the old
+    # username too, whose cached principal has to go.
+    previous = select(models.User.id, models.User.username).filter(models.User.id == user_id).subquery("previous")
+    db_user = await provisioning.write_user(
+        db,
+        update(models.User)
+        .where(models.User.id == previous.c.id)
+        .values(**update_data)
+        .returning(*columns_for(models.User, schemas.User), previous.c.username.label("previous_username")),
+        user.username,
+        user.email,
+        exclude_id=user_id,
+    )
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    invalidate_principal(db_user["previous_username"], db_user["username"])
+    # Field names only; the values (and never the password) stay out of the trail.
+    audit_log.record(
+        audit.USER_UPDATE,
+        request,
+        actor,
+        user_id,
+        {"username": db_user["username"], "fields": sorted(user.model_fields_set)},
+    )
     return db_user
 
 
 @router.delete("/users/{user_id}", response_model=schemas.User)
-def delete_user(
+async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_active_admin_user),
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    actor = audit.actor_of(current_user)
+    # A deleted user is no longer present: tell every worker in the same
+    # statement, over the deleted row.
+    deleted = (
+        delete(models.User)
+        .where(models.User.id == user_id)
+        .returning(*columns_for(models.User, schemas.User))
+        .cte("deleted")
+    )
+    result = await db.execute(
+        select(*deleted.c, presence.notify(presence.CHECK_OUT, user_id)).add_cte(
+            etag.bump_over(deleted, etag.USERS_KEY).cte("bumped")
+        )
+    )
+    deleted = result.mappings().one_or_none()
+    if not deleted:
         raise HTTPException(status_code=404, detail="User not found")
-    db.delete(user)
-    db.commit()
-    return user
+    await db.commit()
+    invalidate_principal(deleted["username"])
+    presence.index.apply(presence.CHECK_OUT, user_id)
+    audit_log.record(audit.USER_DELETE, request, actor, user_id, {"username": deleted["username"]})
+    return deleted
 
 
 @router.get("/users/{user_id}/attendance", response_model=List[schemas.Attendance])
-def read_user_attendance(
+async def read_user_attendance(
     user_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    from_: Optional[datetime] = Query(None, alias="from", description="Only sessions checked in at or after this time"),
+    to: Optional[datetime] = Query(None, description="Only sessions checked in before this time"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=ATTENDANCE_PAGE_MAX),
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    query = select(*columns_for(models.Attendance, schemas.Attendance)).filter(
+        models.Attendance.user_id == user_id
+    )
+    if from_ is not None:
+        query = query.filter(models.Attendance.check_in >= from_)
+    if to is not None:
+        query = query.filter(models.Attendance.check_in < to)
+    result = await db.execute(
+        query.order_by(models.Attendance.check_in.desc()).offset(skip).limit(limit)
+    )
+    return list_response(response, result.all(), schemas.Attendance)
+
+
+@router.get("/attendance/recent", response_model=List[schemas.UserAttendance])
+async def read_recent_attendance(
+    db: AsyncSession = Depends(get_read_db),
+    user_id: Optional[List[int]] = Query(None, description="Users to include; defaults to a page of users by id"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=RECENT_ATTENDANCE_MAX_USERS),
+    from_: Optional[datetime] = Query(None, alias="from", description="Only sessions checked in at or after this time"),
+    to: Optional[datetime] = Query(None, description="Only sessions checked in before this time"),
+    per_user: int = Query(10, ge=1, le=RECENT_ATTENDANCE_MAX_PER_USER),
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    """Each user's latest sessions, for a whole dashboard page in one query.
+
+    A LATERAL subquery takes the top ``per_user`` rows for each user off the
+    (user_id, check_in DESC) index, so cost grows with rows returned rather
+    than with each user's history. Users with no sessions get an empty list.
+    """
+    users = select(models.User.id)
+    if user_id:
+        if len(user_id) > RECENT_ATTENDANCE_MAX_USERS:
+            raise HTTPException(
+                status_code=400, detail=f"At most {RECENT_ATTENDANCE_MAX_USERS} user ids per request"
+            )
+        users = users.filter(models.User.id.in_(user_id))
+    else:
+        users = users.order_by(models.User.id).offset(skip).limit(limit)
+    page = users.subquery()
+
+    attendance = models.Attendance
+    recent = select(*columns_for(attendance, schemas.Attendance)).filter(attendance.user_id == page.c.id)
+    if from_ is not None:
+        recent = recent.filter(attendance.check_in >= from_)
+    if to is not None:
+        recent = recent.filter(attendance.check_in < to)
+    recent = recent.order_by(attendance.check_in.desc()).limit(per_user).lateral()
+
+    result = await db.execute(
+        select(page.c.id.label("owner_id"), recent)
+        .select_from(page.outerjoin(recent, true()))
+        .order_by(page.c.id, recent.c.check_in.desc())
+    )
+    grouped = {}
+    for row in result.mappings():
+        records = grouped.setdefault(row["owner_id"], [])
+        if row["id"] is not None:
+            records.append({name: row[name] for name in schemas.Attendance.model_fields})
+    return [{"user_id": owner_id, "attendance": records} for owner_id, records in grouped.items()]
+
+
+@router.get("/attendance/export")
+async def export_attendance(
+    format: Literal["csv", "ndjson"] = "csv",
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_admin_user),
 ):
-    attendance = (
-        db.query(models.Attendance)
-        .filter(models.Attendance.user_id == user_id)
-        .order_by(models.Attendance.check_in.desc())
-        .all()
+    query = export.attendance_export_query(from_, to, user_id)
+    return StreamingResponse(
+        export.stream_attendance(db.bind, format, query),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="attendance.{format}"'},
     )
-    return attendance
+
+
+@router.get("/presence")
+async def read_presence(
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    return presence.index.snapshot()
+
+
+@router.get("/presence/stream")
+async def stream_presence(
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    return StreamingResponse(
+        presence.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/rollups/weekly", response_model=List[schemas.WeeklyHours])
+async def read_weekly_hours(
+    db: AsyncSession = Depends(get_read_db),
+    week: Optional[date] = Query(None, description="Any day in the week; defaults to the current week"),
+    skip: int = 0,
+    limit: int = 100,
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    week_start = rollups.week_start(week or datetime.utcnow().date())
+    weekly = models.AttendanceWeeklyRollup
+    result = await db.execute(
+        select(
+            models.User.id.label("user_id"),
+            models.User.username,
+            models.User.full_name,
+            func.coalesce(weekly.total_hours, 0.0).label("total_hours"),
+            func.coalesce(weekly.sessions, 0).label("sessions"),
+        )
+        .outerjoin(
+            weekly,
+            and_(weekly.user_id == models.User.id, weekly.week_start == week_start),
+        )
+        .order_by(models.User.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return [{**row, "week_start": week_start} for row in result.mappings()]
+
+
+@router.get("/rollups/daily", response_model=List[schemas.DailyHours])
+async def read_daily_hours(
+    db: AsyncSession = Depends(get_read_db),
+    user_id: Optional[int] = None,
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = Query(None, description="Exclusive end day"),
+    limit: int = Query(1000, ge=1, le=10000),
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    daily = models.AttendanceDailyRollup
+    query = select(daily)
+    if user_id is not None:
+        query = query.filter(daily.user_id == user_id)
+    if from_ is not None:
+        query = query.filter(daily.day >= from_)
+    if to is not None:
+        query = query.filter(daily.day < to)
+    result = await db.execute(query.order_by(daily.day.desc(), daily.user_id).limit(limit))
+    return result.scalars().all()
+
+
+@router.get("/timesheets", response_model=List[schemas.Timesheet])
+async def read_timesheets(
+    from_: date = Query(..., alias="from"),
+    to: date = Query(..., description="Exclusive end day"),
+    user_id: Optional[List[int]] = Query(None, description="Users to include; defaults to everyone with attendance"),
+    include_days: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    """Hours, overtime, night hours and overlapping sessions per user over a period."""
+    if not 0 < (to - from_).days <= settings.TIMESHEET_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The period must span 1 to {settings.TIMESHEET_MAX_DAYS} days",
+        )
+    sessions = await timesheet.load(db, from_, to, user_id)
+    # The arithmetic is CPU-bound; keep it off the event loop.
+    sheet = await run_in_threadpool(timesheet.compute, *sessions, from_, to)
+    summaries = sheet.summaries()
+    if include_days:
+        for row, summary in enumerate(summaries):
+            summary["days"] = sheet.days_of(row)
+    return summaries
+
+
+@router.get("/audit", response_model=List[schemas.AuditEvent])
+async def read_audit_log(
+    response: Response,
+    action: Optional[str] = None,
+    actor_id: Optional[int] = None,
+    target_id: Optional[int] = None,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=AUDIT_PAGE_MAX),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    """Audit events, newest first, a keyset page at a time. Events reach the
+    table up to AUDIT_FLUSH_INTERVAL_SECONDS after they happen."""
+    event = models.AuditEvent
+    query = select(*columns_for(event, schemas.AuditEvent))
+    if action is not None:
+        query = query.filter(event.action == action)
+    if actor_id is not None:
+        query = query.filter(event.actor_id == actor_id)
+    if target_id is not None:
+        query = query.filter(event.target_id == target_id)
+    if from_ is not None:
+        query = query.filter(event.created_at >= from_)
+    if to is not None:
+        query = query.filter(event.created_at < to)
+    if cursor is not None:
+        (before,) = decode_cursor(cursor, "audit")
+        query = query.filter(event.id < before)
+    result = await db.execute(query.order_by(event.id.desc()).limit(limit))
+    events = result.all()
+    if len(events) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor("audit", [events[-1].id])
+    return list_response(response, events, schemas.AuditEvent)
+
+
+@router.get("/stats/principal-cache")
+async def read_principal_cache_stats(
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    return principal_cache.stats()
+
+
+@router.get("/stats/pool")
+async def read_pool_stats(
+    current_user: models.User = Depends(get_current_active_admin_user),
+):
+    return pool_stats()
@@ -1,48 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select
 
-from app import models, schemas, security
+from app import audit, models, schemas, security
+from app.admission import auth_admission
+from app.audit import audit_log
 from app.db import get_db
+from app.provisioning import write_user
+from app.serialization import columns_for
 
 router = APIRouter()
 
 @router.post("/signup", response_model=schemas.User)
-async def signup(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.User).filter(models.User.email == user.email))
-    db_user = result.scalar_one_or_none()
-    if db_user:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-    
-    result = await db.execute(select(models.User).filter(models.User.username == user.username))
-    db_user = result.scalar_one_or_none()
-    if db_user:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already registered")
-    
-    hashed_password = security.get_password_hash(user.password)
-    db_user = models.User(
-        username=user.username,
-        email=user.email,
-        full_name=user.full_name,
-        hashed_password=hashed_password,
-        role="user" # Default role for signup
-    )
-    db.add(db_user)
-    await db.commit()
-    await db.refresh(db_user)
-    return db_user
+async def signup(user: schemas.UserCreate, request: Request, db: AsyncSession = Depends(get_db)):
+    async with auth_admission.admit(request):
+        hashed_password = await security.get_password_hash_async(user.password)
+        db_user = await write_user(
+            db,
+            insert(models.User)
+            .values(
+                username=user.username,
+                email=user.email,
+                full_name=user.full_name,
+                hashed_password=hashed_password,
+                role="user" # Default role for signup
+            )
+            .returning(*columns_for(models.User, schemas.User)),
+            user.username,
+            user.email,
+        )
+        await db.commit()
+        audit_log.record(audit.SIGNUP, request, target_id=db_user["id"], details={"username": db_user["username"]})
+        return db_user
 
 
 @router.post("/login", response_model=schemas.Token)
-async def login(db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    result = await db.execute(select(models.User).filter(models.User.username == form_data.username))
-    user = result.scalar_one_or_none()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    access_token = security.create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+async def login(
+    request: Request, db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+):
+    async with auth_admission.admit(request, form_data.username):
+        result = await db.execute(select(models.User).filter(models.User.username == form_data.username))
+        user = result.scalar_one_or_none()
+        if not user or not await security.verify_password_async(form_data.password, user.hashed_password):
+            auth_admission.failed(form_data.username)
+            audit_log.record(
+                audit.LOGIN_FAILED,
+                request,
+                target_id=user.id if user else None,
+                details={"username": form_data.username},
+            )
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        access_token = security.create_access_token(data={"sub": user.username})
+        audit_log.record(audit.LOGIN, request, audit.actor_of(user), user.id)
+        return {"access_token": access_token, "token_type": "bearer"}
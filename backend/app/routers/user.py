@@ -1,33 +1,48 @@
 from datetime import datetime
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession # Import AsyncSession
-from sqlalchemy import select, desc # Import select and desc
+from sqlalchemy import DateTime, desc, func, literal, select, update # Import select and desc
+from sqlalchemy.dialects.postgresql import insert
 
-from app import models, schemas
-from app.db import get_db
+from app import etag, models, presence, rollups, schemas
+from app.db import get_db, get_read_db
 from app.dependencies import get_current_active_user
+from app.serialization import columns_for, list_response
 
 router = APIRouter()
 
 @router.get("/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(get_current_active_user)):
-    return current_user
+async def read_users_me(
+    request: Request,
+    response: Response,
+    current_user: models.User = Depends(get_current_active_user),
+):
+    # The principal is already loaded (usually from cache), so hashing its
+    # fields is cheaper than looking up a version counter.
+    tag = etag.make_etag(*(getattr(current_user, field) for field in schemas.User.model_fields))
+    return etag.not_modified(request, response, tag) or current_user
 
 
 @router.get("/attendance/last10", response_model=List[schemas.Attendance])
 async def read_last_10_attendance(
-    db: AsyncSession = Depends(get_db), # Change Session to AsyncSession
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db), # Change Session to AsyncSession
     current_user: models.User = Depends(get_current_active_user),
 ):
+    tag = await etag.versioned_etag(db, request, etag.attendance_key(current_user.id))
+    cached = etag.not_modified(request, response, tag)
+    if cached:
+        return cached
     result = await db.execute(
-        select(models.Attendance)
+        select(*columns_for(models.Attendance, schemas.Attendance))
         .filter(models.Attendance.user_id == current_user.id)
         .order_by(desc(models.Attendance.check_in)) # Use desc() from sqlalchemy
         .limit(10)
     )
-    return result.scalars().all()
+    return list_response(response, result.all(), schemas.Attendance)
 
 
 @router.post("/attendance/check-in", response_model=schemas.Attendance)
@@ -35,23 +50,34 @@ async def check_in(
     db: AsyncSession = Depends(get_db), # Change Session to AsyncSession
     current_user: models.User = Depends(get_current_active_user),
 ):
-    # Check for active check-in
+    # Read before the commit expires the principal.
+    user_id = current_user.id
+    check_in_at = datetime.utcnow()
+    # One statement: a second open session (double click, concurrent request)
+    # becomes a no-op returning no row, as the attendance_open trigger skips
+    # the row (a partitioned table cannot have the partial unique index that
+    # ON CONFLICT would otherwise arbitrate on). The NOTIFY is selected
+    # over the inserted row, as is the version bump, so both only happen for
+    # a real check-in.
+    inserted = (
+        insert(models.Attendance)
+        .values(user_id=user_id, check_in=check_in_at)
+        .on_conflict_do_nothing()
+        .returning(*models.Attendance.__table__.c)
+        .cte("inserted")
+    )
     result = await db.execute(
-        select(models.Attendance)
-        .filter(
-            models.Attendance.user_id == current_user.id,
-            models.Attendance.check_out.is_(None),
+        select(*inserted.c, presence.notify(presence.CHECK_IN, user_id, check_in_at)).add_cte(
+            etag.bump_over(inserted, etag.attendance_key(user_id)).cte("bumped")
         )
     )
-    active_check_in = result.scalar_one_or_none()
+    new_attendance = result.mappings().one_or_none()
 
-    if active_check_in:
+    if new_attendance is None:
         raise HTTPException(status_code=400, detail="User already checked in")
 
-    new_attendance = models.Attendance(user_id=current_user.id, check_in=datetime.utcnow())
-    db.add(new_attendance)
     await db.commit() # Await commit
-    await db.refresh(new_attendance) # Await refresh
+    presence.index.apply(presence.CHECK_IN, user_id, check_in_at)
     return new_attendance
 
 
@@ -60,21 +86,33 @@ async def check_out(
     db: AsyncSession = Depends(get_db), # Change Session to AsyncSession
     current_user: models.User = Depends(get_current_active_user),
 ):
+    user_id = current_user.id
+    # Close the open session and compute its hours in the same UPDATE. The
+    # clock is the app's, as for check-in, so the two ends always agree. The
+    # rollups, version bump and NOTIFY all read the closed row in the same
+    # statement, so a check-out is one round trip plus the commit.
+    check_out_at = datetime.utcnow()
+    attendance = models.Attendance
+    closed = (
+        update(attendance)
+        .where(attendance.user_id == user_id, attendance.check_out.is_(None))
+        .values(
+            check_out=check_out_at,
+            total_hours=func.extract("epoch", literal(check_out_at, DateTime) - attendance.check_in) / 3600.0,
+        )
+        .returning(*attendance.__table__.c)
+        .cte("closed")
+    )
     result = await db.execute(
-        select(models.Attendance)
-        .filter(
-            models.Attendance.user_id == current_user.id,
-            models.Attendance.check_out.is_(None),
+        select(*closed.c, presence.notify(presence.CHECK_OUT, user_id)).add_cte(
+            *rollups.upserts_over(closed), etag.bump_over(closed, etag.attendance_key(user_id)).cte("bumped")
         )
     )
-    active_check_in = result.scalar_one_or_none()
+    closed = result.mappings().one_or_none()
 
-    if not active_check_in:
+    if closed is None:
         raise HTTPException(status_code=400, detail="User not checked in")
 
-    active_check_in.check_out = datetime.utcnow()
-    duration = active_check_in.check_out - active_check_in.check_in
-    active_check_in.total_hours = duration.total_seconds() / 3600
     await db.commit() # Await commit
-    await db.refresh(active_check_in) # Await refresh
-    return active_check_in
\ No newline at end of file
+    presence.index.apply(presence.CHECK_OUT, user_id)
+    return closed
@@ -1,47 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import insert, select
+from typing import List, Optional
 
 from .. import models, schemas
-from ..db import get_db
-from ..security import get_password_hash
+from ..db import get_db, get_read_db
+from ..pagination import UserOrder, paginate_users, set_next_cursor
+from ..provisioning import write_user
+from ..serialization import columns_for, list_response
+from ..security import get_password_hash_async
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.User)
 async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.User).filter(models.User.email == user.email))
-    db_user = result.scalar_one_or_none()
-    if db_user:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-    
-    result = await db.execute(select(models.User).filter(models.User.username == user.username))
-    db_user = result.scalar_one_or_none()
-    if db_user:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already registered")
-    
-    hashed_password = get_password_hash(user.password)
-    new_user = models.User(
-        username=user.username, 
-        email=user.email, 
-        full_name=user.full_name, 
-        hashed_password=hashed_password,
-        role="user" # Default role
+    hashed_password = await get_password_hash_async(user.password)
+    new_user = await write_user(
+        db,
+        insert(models.User)
+        .values(
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            hashed_password=hashed_password,
+            role="user", # Default role
+        )
+        .returning(*columns_for(models.User, schemas.User)),
+        user.username,
+        user.email,
     )
-    db.add(new_user)
     await db.commit()
-    await db.refresh(new_user)
     return new_user
 
 @router.get("/", response_model=List[schemas.User])
-async def read_users(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.User).offset(skip).limit(limit))
-    users = result.scalars().all()
-    return users
+async def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order_by: UserOrder = "id",
+    db: AsyncSession = Depends(get_read_db),
+):
+    result = await db.execute(
+        paginate_users(select(*columns_for(models.User, schemas.User)), order_by, cursor, skip, limit)
+    )
+    users = result.all()
+    set_next_cursor(response, users, order_by, limit)
+    return list_response(response, users, schemas.User)
 
 @router.get("/{user_id}", response_model=schemas.User)
-async def read_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def read_user(user_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(models.User).filter(models.User.id == user_id))
     user = result.scalar_one_or_none()
     if user is None:
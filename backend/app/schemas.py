@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
-from datetime import datetime
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime
 
 class UserBase(BaseModel):
     username: str
@@ -32,6 +32,72 @@ class Attendance(AttendanceBase):
     class Config:
         from_attributes = True
 
+class UserAttendance(BaseModel):
+    user_id: int
+    attendance: List[Attendance]
+
+class BulkImportRow(BaseModel):
+    row: int
+    username: Optional[str] = None
+    status: str
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BulkImportResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkImportRow]
+
+class DailyHours(BaseModel):
+    user_id: int
+    day: date
+    total_hours: float
+    sessions: int
+
+    class Config:
+        from_attributes = True
+
+class WeeklyHours(BaseModel):
+    user_id: int
+    username: str
+    full_name: Optional[str] = None
+    week_start: date
+    total_hours: float
+    sessions: int
+
+class TimesheetDay(BaseModel):
+    day: date
+    hours: float
+    overtime_hours: float
+    daily_overtime_hours: float
+    weekly_overtime_hours: float
+    night_hours: float
+    sessions: int
+
+class Timesheet(BaseModel):
+    user_id: int
+    total_hours: float
+    regular_hours: float
+    overtime_hours: float
+    daily_overtime_hours: float
+    weekly_overtime_hours: float
+    night_hours: float
+    sessions: int
+    overlapping_sessions: int
+    duplicate_sessions: int
+    overlap_hours: float
+    days: Optional[List[TimesheetDay]] = None
+
+class AuditEvent(BaseModel):
+    id: int
+    created_at: datetime
+    action: str
+    actor_id: Optional[int] = None
+    actor_username: Optional[str] = None
+    target_id: Optional[int] = None
+    client_ip: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
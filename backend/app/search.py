@@ -0,0 +1,51 @@
+"""Typeahead search over users (migration d9a5b3e81c47 adds the indexes).
+
+Prefix matches on username, email or full name use lower(...)
+text_pattern_ops btree indexes; substring matches use a trigram GIN index
+over all three, and only kick in from ``TRIGRAM_MIN_LENGTH`` characters, below
+which trigrams cannot narrow the scan. Results are ranked: exact username,
+then username, email and full-name prefixes, then other substring matches.
+"""
+from sqlalchemy import Select, case, func, literal_column, or_, select
+
+from app import models, schemas
+from app.serialization import columns_for
+
+TRIGRAM_MIN_LENGTH = 3
+
+# Must stay identical to the expression of ix_users_search_trgm.
+SEARCH_DOCUMENT = literal_column(
+    "lower(coalesce(users.username, '') || ' ' || coalesce(users.email, '') || ' ' || coalesce(users.full_name, ''))"
+)
+
+
+def _like_escape(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_users(q: str, limit: int) -> Select:
+    term = q.strip().lower()
+    prefix = _like_escape(term) + "%"
+    username = func.lower(models.User.username)
+    email = func.lower(models.User.email)
+    full_name = func.lower(models.User.full_name)
+    matches = [
+        username.like(prefix, escape="\\"),
+        email.like(prefix, escape="\\"),
+        full_name.like(prefix, escape="\\"),
+    ]
+    if len(term) >= TRIGRAM_MIN_LENGTH:
+        matches.append(SEARCH_DOCUMENT.like(f"%{_like_escape(term)}%", escape="\\"))
+    rank = case(
+        (username == term, 0),
+        (matches[0], 1),
+        (matches[1], 2),
+        (matches[2], 3),
+        else_=4,
+    )
+    return (
+        select(*columns_for(models.User, schemas.User))
+        .filter(or_(*matches))
+        .order_by(rank, func.length(models.User.username), models.User.username)
+        .limit(limit)
+    )
@@ -4,16 +4,25 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession # Import AsyncSession
 from sqlalchemy import select # Import select
 
 from app import models, schemas
 from app.core.config import settings
+from app.cache import TTLCache
 from app.db import get_db
+from app.hashing import HasherBusy, PasswordHasher, pwd_context
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+password_hasher = PasswordHasher(
+    pool=settings.PASSWORD_HASH_POOL,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
+principal_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 ALGORITHM = "HS256"
@@ -30,6 +39,35 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+def _hasher_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def verify_password_async(plain_password, hashed_password):
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusy:
+        raise _hasher_busy_exception()
+
+
+async def get_password_hash_async(password):
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy:
+        raise _hasher_busy_exception()
+
+
+async def get_password_hashes_async(passwords):
+    try:
+        return await password_hasher.hash_many(list(passwords))
+    except HasherBusy:
+        raise _hasher_busy_exception()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -49,6 +87,8 @@ def decode_access_token(token: str):
         return None
 
 
+# Always the primary, never the replica: a lagging replica would keep
+# authorizing a user who was just deleted or had their role lowered.
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)): # Changed db to AsyncSession
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,9 +99,28 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     if token_data is None:
         raise credentials_exception
     
-    result = await db.execute(select(models.User).filter(models.User.username == token_data["sub"]))
+    username = token_data.get("sub")
+    if username is None:
+        raise credentials_exception
+
+    # Cache plain column values rather than the ORM instance: the instance would
+    # be bound to (and expired by) the session of the request that loaded it.
+    cached = principal_cache.get(username)
+    if cached is not None:
+        return models.User(**cached)
+
+    result = await db.execute(select(models.User).filter(models.User.username == username))
     user = result.scalar_one_or_none()
-    
+
     if user is None:
         raise credentials_exception
+    principal_cache.set(username, _principal_snapshot(user))
     return user
+
+
+def _principal_snapshot(user: models.User) -> dict:
+    return {column.key: getattr(user, column.key) for column in models.User.__table__.columns}
+
+
+def invalidate_principal(*usernames: Optional[str]) -> None:
+    principal_cache.invalidate(*(name for name in usernames if name))
@@ -0,0 +1,94 @@
+"""Work done once per worker before it starts serving.
+
+Each phase is timed; the timings are logged and exported on /metrics as
+``startup_<phase>_seconds`` so slow cold starts show up next to the latency
+they would otherwise have caused.
+"""
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Dict, Optional
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.security import password_hasher
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_DIR = Path(__file__).resolve().parent.parent / "alembic"
+
+timings: Dict[str, float] = {}
+
+
+class MigrationsPending(RuntimeError):
+    pass
+
+
+async def _timed(phase: str, coro) -> None:
+    started = time.perf_counter()
+    await coro
+    timings[f"{phase}_seconds"] = time.perf_counter() - started
+    logger.info("Startup phase %s took %.1f ms", phase, 1000 * timings[f"{phase}_seconds"])
+
+
+def alembic_heads() -> set:
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+async def database_revisions(engine: AsyncEngine) -> Optional[set]:
+    """Revisions recorded in alembic_version, or None if it does not exist."""
+    async with engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        except ProgrammingError:
+            return None
+        return {revision for (revision,) in result}
+
+
+async def check_migrations(engine: AsyncEngine, policy: str) -> None:
+    if policy == "off":
+        return
+    heads = alembic_heads()
+    current = await database_revisions(engine)
+    if current == heads:
+        return
+    message = f"Database is at {sorted(current) if current is not None else 'no Alembic revision'}, code expects {sorted(heads)}"
+    if policy == "fail":
+        raise MigrationsPending(message)
+    logger.warning("%s; run `alembic upgrade head`", message)
+
+
+async def warm_pool(engine: AsyncEngine, connections: int) -> None:
+    """Open ``connections`` pooled connections at once, then return them to the
+    pool, so the first requests skip connection setup."""
+    connections = min(connections, settings.DB_POOL_SIZE)
+    if connections <= 0:
+        return
+    async with AsyncExitStack() as stack:
+        conns = await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(connections))
+        )
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+
+
+async def run(engine: AsyncEngine, read_engine: Optional[AsyncEngine] = None) -> None:
+    timings.clear()
+    started = time.perf_counter()
+    await _timed("migration_check", check_migrations(engine, settings.STARTUP_MIGRATION_CHECK))
+    phases = [_timed("pool_warmup", warm_pool(engine, settings.DB_POOL_WARMUP_CONNECTIONS))]
+    if read_engine is not None:
+        phases.append(_timed("read_pool_warmup", warm_pool(read_engine, settings.DB_POOL_WARMUP_CONNECTIONS)))
+    if settings.PASSWORD_HASH_WARMUP:
+        phases.append(_timed("hasher_warmup", password_hasher.warm_up()))
+    await asyncio.gather(*phases)
+    timings["total_seconds"] = time.perf_counter() - started
+    logger.info("Startup finished in %.1f ms", 1000 * timings["total_seconds"])
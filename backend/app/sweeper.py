@@ -0,0 +1,95 @@
+"""Auto-close attendance sessions that were never checked out.
+
+A session is stale once it has been open for STALE_SESSION_MAX_HOURS. What it
+is closed as depends on STALE_SESSION_POLICY:
+
+- ``zero``: check_out = check_in, so the session counts 0 hours;
+- ``cap``: check_out = check_in + STALE_SESSION_MAX_HOURS;
+- ``end_of_day``: check_out = midnight (UTC) after check_in, or now if earlier.
+
+Sessions are closed in batches of STALE_SESSION_BATCH_SIZE, each batch one
+UPDATE over rows locked with SKIP LOCKED and committed on its own, together
+with the rollups, ETag versions and presence updates a check-out would make.
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import DateTime, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import etag, models, presence, rollups
+from app.core.config import settings
+
+
+def _close_at(policy: str, now: datetime, max_hours: float):
+    attendance = models.Attendance
+    if policy == "cap":
+        return attendance.check_in + literal(timedelta(hours=max_hours))
+    if policy == "end_of_day":
+        return func.least(
+            func.date_trunc("day", attendance.check_in) + literal(timedelta(days=1)),
+            literal(now, DateTime),
+        )
+    return attendance.check_in
+
+
+def close_stale_batch(now: datetime, policy: str, max_hours: float, batch_size: int):
+    """UPDATE closing up to ``batch_size`` of the oldest stale sessions."""
+    attendance = models.Attendance
+    stale = (
+        select(attendance.id, attendance.check_in)
+        .filter(
+            attendance.check_out.is_(None),
+            attendance.check_in < now - timedelta(hours=max_hours),
+        )
+        .order_by(attendance.check_in)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("stale")
+    )
+    close_at = _close_at(policy, now, max_hours)
+    return (
+        update(attendance)
+        # check_in in the join lets a partitioned table prune to the right month.
+        .where(
+            attendance.id == stale.c.id,
+            attendance.check_in == stale.c.check_in,
+            attendance.check_out.is_(None),
+        )
+        .values(
+            check_out=close_at,
+            total_hours=func.extract("epoch", close_at - attendance.check_in) / 3600.0,
+        )
+        .returning(attendance.user_id, attendance.check_in, attendance.check_out)
+    )
+
+
+async def close_stale_sessions(
+    session_factory: Callable[[], AsyncSession],
+    now: Optional[datetime] = None,
+    policy: Optional[str] = None,
+    max_hours: Optional[float] = None,
+    batch_size: Optional[int] = None,
+) -> dict:
+    now = now or datetime.utcnow()
+    policy = policy or settings.STALE_SESSION_POLICY
+    max_hours = max_hours if max_hours is not None else settings.STALE_SESSION_MAX_HOURS
+    batch_size = batch_size or settings.STALE_SESSION_BATCH_SIZE
+    closed = batches = 0
+    while True:
+        async with session_factory() as db:
+            result = await db.execute(close_stale_batch(now, policy, max_hours, batch_size))
+            sessions = result.all()
+            if not sessions:
+                return {"closed": closed, "batches": batches}
+            user_ids = sorted({user_id for user_id, _, _ in sessions if user_id is not None})
+            await rollups.apply_sessions(db, sessions)
+            await etag.bump(db, *(etag.attendance_key(user_id) for user_id in user_ids))
+            await presence.publish_many(db, presence.CHECK_OUT, user_ids)
+            await db.commit()
+        for user_id in user_ids:
+            presence.index.apply(presence.CHECK_OUT, user_id)
+        closed += len(sessions)
+        batches += 1
+        if len(sessions) < batch_size:
+            return {"closed": closed, "batches": batches}
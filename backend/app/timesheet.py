@@ -0,0 +1,290 @@
+"""Timesheets and overtime over a period, computed on columnar arrays.
+
+A period's closed sessions are loaded in one query as three arrays (user,
+check-in and check-out in seconds from the start of the period) and every
+step below is a NumPy operation over all sessions at once:
+
+1. Sessions are clipped to the period and sorted by user and check-in.
+   A session starting before the previous ones of the same user have ended
+   is *overlapping* (an exact repeat is also a *duplicate*); only the part not
+   already covered counts, so overlapping time is never paid twice.
+2. The remaining time is split at midnight into per-day pieces, and the part
+   of each piece inside the night window is measured.
+3. Pieces are summed into a users x days matrix. Hours past
+   OVERTIME_DAILY_HOURS a day are daily overtime. The regular hours left are
+   accumulated through each Monday-based week, and those past
+   OVERTIME_WEEKLY_HOURS are weekly overtime, on the day they were worked.
+
+A period starting mid-week is computed from that week's Monday, so the days
+before it count towards the week's threshold, and only the period's own days
+are reported. Days after the period cannot move overtime onto earlier days, so
+they are not needed.
+
+Days are UTC calendar days, as in ``rollups``. Sessions still open are left
+out, and sessions are assumed to last less than MAX_SESSION_DAYS (which lets
+the check-in index and partitions bound the scan).
+"""
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import DateTime, Float, cast, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.config import settings
+from app.rollups import week_start
+
+DAY_SECONDS = 86400.0
+HOUR_SECONDS = 3600.0
+MAX_SESSION_DAYS = 7
+
+
+class Timesheet:
+    """Per-user results of ``compute``; row ``i`` of every array is ``user_ids[i]``.
+
+    Arrays are users x ``days`` (the period), except ``weekly_hours``: users x
+    ``week_starts``, each week's hours from its Monday up to the period's end.
+    """
+
+    __slots__ = (
+        "user_ids",
+        "days",
+        "week_starts",
+        "hours",
+        "night_hours",
+        "sessions",
+        "daily_overtime",
+        "weekly_overtime",
+        "weekly_hours",
+        "overlapping",
+        "duplicates",
+        "overlap_hours",
+    )
+
+    def __init__(self, **arrays):
+        for name in self.__slots__:
+            setattr(self, name, arrays[name])
+
+    def summaries(self) -> List[dict]:
+        daily_overtime = self.daily_overtime.sum(axis=1)
+        weekly_overtime = self.weekly_overtime.sum(axis=1)
+        total = self.hours.sum(axis=1)
+        overtime = daily_overtime + weekly_overtime
+        columns = {
+            "user_id": self.user_ids,
+            "total_hours": total,
+            "regular_hours": total - overtime,
+            "overtime_hours": overtime,
+            "daily_overtime_hours": daily_overtime,
+            "weekly_overtime_hours": weekly_overtime,
+            "night_hours": self.night_hours.sum(axis=1),
+            "sessions": self.sessions.sum(axis=1),
+            "overlapping_sessions": self.overlapping,
+            "duplicate_sessions": self.duplicates,
+            "overlap_hours": self.overlap_hours,
+        }
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*(column.tolist() for column in columns.values()))]
+
+    def days_of(self, row: int) -> List[dict]:
+        """Days of one user with any time or session, in order. Their overtime
+        adds up to the user's summary."""
+        active = np.flatnonzero((self.hours[row] > 0) | (self.sessions[row] > 0))
+        daily_overtime = self.daily_overtime[row, active]
+        weekly_overtime = self.weekly_overtime[row, active]
+        return [
+            {
+                "day": self.days[i],
+                "hours": hours,
+                "overtime_hours": daily + weekly,
+                "daily_overtime_hours": daily,
+                "weekly_overtime_hours": weekly,
+                "night_hours": night,
+                "sessions": count,
+            }
+            for i, hours, daily, weekly, night, count in zip(
+                active.tolist(),
+                self.hours[row, active].tolist(),
+                daily_overtime.tolist(),
+                weekly_overtime.tolist(),
+                self.night_hours[row, active].tolist(),
+                self.sessions[row, active].tolist(),
+            )
+        ]
+
+
+def _night_seconds(start: np.ndarray, end: np.ndarray, night_start: float, night_end: float) -> np.ndarray:
+    """Seconds of [start, end) (seconds into the same day) inside the night window."""
+    if night_start == night_end:
+        return np.zeros_like(start)
+    if night_start < night_end:
+        windows = [(night_start, night_end)]
+    else:
+        windows = [(0.0, night_end), (night_start, 24.0)]
+    seconds = np.zeros_like(start)
+    for window_start, window_end in windows:
+        seconds += np.clip(
+            np.minimum(end, window_end * HOUR_SECONDS) - np.maximum(start, window_start * HOUR_SECONDS), 0.0, None
+        )
+    return seconds
+
+
+def compute(
+    user_ids: Sequence[int],
+    check_ins: Sequence[float],
+    check_outs: Sequence[float],
+    start: date,
+    end: date,
+    daily_threshold: Optional[float] = None,
+    weekly_threshold: Optional[float] = None,
+    night_start: Optional[float] = None,
+    night_end: Optional[float] = None,
+) -> Timesheet:
+    """Timesheets for the days ``start`` (inclusive) to ``end`` (exclusive).
+
+    ``check_ins``/``check_outs`` are seconds from midnight of ``start``, and
+    should include the sessions since the Monday of ``start``'s week (see
+    ``load``). Thresholds and the night window default to the settings; a
+    threshold of 0 disables that kind of overtime.
+    """
+    n_days = (end - start).days
+    if n_days <= 0:
+        raise ValueError("The period must span at least one day")
+    daily_threshold = settings.OVERTIME_DAILY_HOURS if daily_threshold is None else daily_threshold
+    weekly_threshold = settings.OVERTIME_WEEKLY_HOURS if weekly_threshold is None else weekly_threshold
+    night_start = settings.NIGHT_SHIFT_START_HOUR if night_start is None else night_start
+    night_end = settings.NIGHT_SHIFT_END_HOUR if night_end is None else night_end
+
+    # Work on whole weeks from the Monday of ``start``: times are shifted to
+    # seconds from that Monday, and days [lead, lead + n_days) are reported.
+    first_week = week_start(start)
+    lead = start.weekday()
+    n_weeks = -(-(lead + n_days) // 7)
+    grid_days = n_weeks * 7
+    period_start = lead * DAY_SECONDS
+    span = (lead + n_days) * DAY_SECONDS
+
+    users = np.asarray(user_ids, dtype=np.int64)
+    raw_in = np.asarray(check_ins, dtype=np.float64) + period_start
+    raw_out = np.asarray(check_outs, dtype=np.float64) + period_start
+    keep = (raw_out >= raw_in) & (raw_in < span) & ((raw_out > 0) | (raw_in >= 0))
+    users, raw_in, raw_out = users[keep], raw_in[keep], raw_out[keep]
+    user_index, index = np.unique(users, return_inverse=True)
+    n_users = len(user_index)
+
+    order = np.lexsort((raw_out, raw_in, index))
+    index, raw_in, raw_out = index[order], raw_in[order], raw_out[order]
+    ins = np.clip(raw_in, 0.0, span)
+    outs = np.clip(raw_out, 0.0, span)
+
+    # 1. Overlaps. Offsetting each user's times by a stride longer than the
+    # period makes one running maximum restart at every user. Only sessions
+    # reaching into the period itself are reported.
+    same_user = np.r_[False, index[1:] == index[:-1]]
+    stride = span + 1.0
+    covered = np.maximum.accumulate(outs + index * stride) - index * stride
+    covered_before = np.where(same_user, np.r_[0.0, covered[:-1]], 0.0)
+    in_period = (raw_out > period_start) | (raw_in >= period_start)
+    overlapping = in_period & same_user & (ins < covered_before)
+    duplicate = (
+        in_period & same_user & (raw_in == np.r_[np.nan, raw_in[:-1]]) & (raw_out == np.r_[np.nan, raw_out[:-1]])
+    )
+    paid_in = np.minimum(np.maximum(ins, covered_before), outs)
+    overlap_seconds = np.clip(paid_in - np.maximum(ins, period_start), 0.0, None)
+
+    # 2. Split what is left at midnight.
+    paid = outs > paid_in
+    piece_user, piece_in, piece_out = index[paid], paid_in[paid], outs[paid]
+    first_day = np.floor(piece_in / DAY_SECONDS).astype(np.int64)
+    last_day = np.maximum(first_day, np.ceil(piece_out / DAY_SECONDS).astype(np.int64) - 1)
+    counts = last_day - first_day + 1
+    session_of_piece = np.repeat(np.arange(len(counts)), counts)
+    piece_day = first_day[session_of_piece] + (
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    )
+    day_start = piece_day * DAY_SECONDS
+    start_in_day = np.maximum(piece_in[session_of_piece], day_start) - day_start
+    end_in_day = np.minimum(piece_out[session_of_piece], day_start + DAY_SECONDS) - day_start
+
+    # 3. Users x days totals over the whole weeks.
+    cells = n_users * grid_days
+    cell = piece_user[session_of_piece] * grid_days + piece_day
+    hours = np.bincount(cell, (end_in_day - start_in_day) / HOUR_SECONDS, minlength=cells).reshape(
+        n_users, grid_days
+    )
+    night_hours = np.bincount(
+        cell, _night_seconds(start_in_day, end_in_day, night_start, night_end) / HOUR_SECONDS, minlength=cells
+    ).reshape(n_users, grid_days)
+    # Like the rollups, a session counts on the day it started.
+    started = raw_in >= 0
+    sessions = np.bincount(
+        index[started] * grid_days + np.floor(raw_in[started] / DAY_SECONDS).astype(np.int64), minlength=cells
+    ).reshape(n_users, grid_days)
+
+    daily_overtime = np.clip(hours - daily_threshold, 0.0, None) if daily_threshold > 0 else np.zeros_like(hours)
+    # Regular hours run up through each week; what a day adds past the
+    # threshold is that day's weekly overtime.
+    regular = (hours - daily_overtime).reshape(n_users, n_weeks, 7)
+    if weekly_threshold > 0:
+        running = np.cumsum(regular, axis=2)
+        weekly_overtime = np.clip(running - weekly_threshold, 0.0, None) - np.clip(
+            running - regular - weekly_threshold, 0.0, None
+        )
+    else:
+        weekly_overtime = np.zeros_like(regular)
+
+    period = slice(lead, lead + n_days)
+    return Timesheet(
+        user_ids=user_index,
+        days=[start + timedelta(days=i) for i in range(n_days)],
+        week_starts=[first_week + timedelta(weeks=week) for week in range(n_weeks)],
+        hours=hours[:, period],
+        night_hours=night_hours[:, period],
+        sessions=sessions[:, period],
+        daily_overtime=daily_overtime[:, period],
+        weekly_overtime=weekly_overtime.reshape(n_users, grid_days)[:, period],
+        weekly_hours=hours.reshape(n_users, n_weeks, 7).sum(axis=2),
+        overlapping=np.bincount(index, overlapping, minlength=n_users).astype(np.int64),
+        duplicates=np.bincount(index, duplicate, minlength=n_users).astype(np.int64),
+        overlap_hours=np.bincount(index, overlap_seconds, minlength=n_users) / HOUR_SECONDS,
+    )
+
+
+def sessions_query(
+    start: date, end: date, user_ids: Optional[Sequence[int]] = None, origin: Optional[date] = None
+):
+    """One row of three arrays: user ids, check-ins and check-outs in seconds
+    from midnight of ``origin`` (default ``start``), for sessions overlapping
+    ``start`` to ``end``. Aggregating server side keeps the transfer columnar
+    rather than one Python tuple per session."""
+    attendance = models.Attendance
+    since = datetime.combine(start, time.min)
+    until = datetime.combine(end, time.min)
+    origin = datetime.combine(origin or start, time.min)
+
+    def seconds(column):
+        return cast(func.extract("epoch", column - literal(origin, DateTime)), Float)
+
+    query = select(
+        func.array_agg(attendance.user_id),
+        func.array_agg(seconds(attendance.check_in)),
+        func.array_agg(seconds(attendance.check_out)),
+    ).filter(
+        attendance.user_id.is_not(None),
+        attendance.check_out.is_not(None),
+        attendance.check_in >= since - timedelta(days=MAX_SESSION_DAYS),
+        attendance.check_in < until,
+        attendance.check_out > since,
+    )
+    if user_ids is not None:
+        query = query.filter(attendance.user_id.in_(user_ids))
+    return query
+
+
+async def load(db: AsyncSession, start: date, end: date, user_ids: Optional[Sequence[int]] = None):
+    """The sessions ``compute`` needs for ``start`` to ``end``: from the Monday
+    of ``start``'s week, in seconds from midnight of ``start``."""
+    result = await db.execute(sessions_query(week_start(start), end, user_ids, origin=start))
+    user_column, check_ins, check_outs = result.one()
+    return user_column or [], check_ins or [], check_outs or []
@@ -0,0 +1,68 @@
+"""Compare the default response_model path with the fast row serializer.
+
+Needs no database. Run from ``backend/``:
+
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app import schemas
+from app.serialization import dump_rows, fields_of, orjson
+
+
+def make_rows(count: int):
+    UserRow = namedtuple("UserRow", fields_of(schemas.User))
+    AttendanceRow = namedtuple("AttendanceRow", fields_of(schemas.Attendance))
+    start = datetime(2025, 1, 6, 8, 30, 15, 123456)
+    users = [
+        UserRow(f"user{i}", f"user{i}@example.com", f"User Number {i}", i, "user") for i in range(count)
+    ]
+    attendance = [
+        AttendanceRow(start + timedelta(hours=i), start + timedelta(hours=i, minutes=495), 8.25, i, i % 500)
+        for i in range(count)
+    ]
+    return users, attendance
+
+
+async def default_path(field, rows) -> bytes:
+    # What FastAPI does for a response_model: validate, serialize, json.dumps.
+    content = await serialize_response(field=field, response_content=rows)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    users, attendance = make_rows(args.rows)
+    print(f"encoder: {'orjson' if orjson else 'stdlib json'}, rows: {args.rows}")
+    for name, schema, rows in (("users", schemas.User, users), ("attendance", schemas.Attendance, attendance)):
+        field = create_response_field(name="response", type_=List[schema])
+        assert json.loads(asyncio.run(default_path(field, rows))) == json.loads(dump_rows(rows, fields_of(schema)))
+        slow = best_of(args.repeat, lambda: asyncio.run(default_path(field, rows)))
+        fast = best_of(args.repeat, lambda: dump_rows(rows, fields_of(schema)))
+        print(f"{name:10} response_model {slow * 1000:8.1f}ms   fast path {fast * 1000:8.1f}ms   {slow / fast:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
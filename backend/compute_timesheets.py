@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+import csv
+import sys
+import time
+from datetime import date
+
+from app import timesheet
+from app.db import AsyncSessionLocal
+
+COLUMNS = [
+    "user_id",
+    "total_hours",
+    "regular_hours",
+    "overtime_hours",
+    "daily_overtime_hours",
+    "weekly_overtime_hours",
+    "night_hours",
+    "sessions",
+    "overlapping_sessions",
+    "duplicate_sessions",
+    "overlap_hours",
+]
+
+
+async def compute_timesheets(start: date, end: date):
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        sessions = await timesheet.load(session, start, end)
+    loaded = time.perf_counter()
+    summaries = timesheet.compute(*sessions, start, end).summaries()
+    writer = csv.DictWriter(sys.stdout, COLUMNS)
+    writer.writeheader()
+    writer.writerows(summaries)
+    print(
+        f"{len(sessions[0])} sessions, {len(summaries)} users: "
+        f"loaded in {loaded - started:.2f}s, computed in {time.perf_counter() - loaded:.2f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write per-user timesheets for a period as CSV.")
+    parser.add_argument("start", type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+    parser.add_argument("end", type=date.fromisoformat, help="Day after the last one (YYYY-MM-DD)")
+    args = parser.parse_args()
+    asyncio.run(compute_timesheets(args.start, args.end))
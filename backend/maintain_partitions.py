@@ -0,0 +1,19 @@
+import asyncio
+
+from app import partitions
+from app.db import AsyncSessionLocal
+
+
+async def maintain_partitions():
+    async with AsyncSessionLocal() as session:
+        if not await partitions.is_partitioned(session):
+            print("attendance is not partitioned; run the migrations first.")
+            return
+        result = await partitions.maintain(session)
+        await session.commit()
+    for action, names in result.items():
+        print(f"{action.capitalize()}: {', '.join(names) or 'none'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(maintain_partitions())
@@ -0,0 +1,15 @@
+import asyncio
+
+from app import rollups
+from app.db import AsyncSessionLocal
+
+
+async def rebuild_rollups():
+    async with AsyncSessionLocal() as session:
+        await rollups.rebuild(session)
+        await session.commit()
+    print("Attendance rollups rebuilt.")
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_rollups())
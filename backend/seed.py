@@ -1,8 +1,11 @@
 import asyncio
-from sqlalchemy import select
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
 from app.db import AsyncSessionLocal, async_engine, Base
+from app.models.attendance import Attendance
 from app.models.user import User
-from app.security import get_password_hash
+from app.security import get_password_hash_async, password_hasher
 
 async def seed_db():
     async with AsyncSessionLocal() as session:
@@ -17,7 +20,7 @@ async def seed_db():
             # await session.commit()
             # print("Admin password reset (if it changed).")
         else:
-            hashed_password = get_password_hash("admin123")
+            hashed_password = await get_password_hash_async("admin123")
             admin_user = User(
                 username="admin",
                 email="admin@example.com",
@@ -30,6 +33,65 @@ async def seed_db():
             await session.refresh(admin_user)
             print("Admin user created!")
 
+BENCH_USER_PREFIX = "bench_user_"
+SEED_CHUNK_SIZE = 1000
+
+
+async def seed_bench_users(session, count, password):
+    """Create bench_user_0..count-1 (all sharing one password) if missing.
+
+    The password is hashed once and reused, so seeding thousands of users does
+    not spend minutes in argon2. Returns the ids of all bench users.
+    """
+    result = await session.execute(
+        select(func.count()).select_from(User).filter(User.username.like(f"{BENCH_USER_PREFIX}%"))
+    )
+    existing = result.scalar_one()
+    if existing < count:
+        hashed_password = await get_password_hash_async(password)
+        rows = [
+            {
+                "username": f"{BENCH_USER_PREFIX}{i}",
+                "email": f"{BENCH_USER_PREFIX}{i}@example.com",
+                "full_name": f"Bench User {i}",
+                "hashed_password": hashed_password,
+                "role": "user",
+            }
+            for i in range(existing, count)
+        ]
+        for start in range(0, len(rows), SEED_CHUNK_SIZE):
+            await session.execute(insert(User), rows[start:start + SEED_CHUNK_SIZE])
+        await session.commit()
+    result = await session.execute(
+        select(User.id).filter(User.username.like(f"{BENCH_USER_PREFIX}%")).order_by(User.id)
+    )
+    return result.scalars().all()
+
+
+async def seed_bench_attendance(session, user_ids, count, days=90, seed=0):
+    """Insert ``count`` closed attendance sessions spread over the last ``days``."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    rows = []
+    for _ in range(count):
+        check_in = now - timedelta(days=rng.randint(1, days), hours=rng.uniform(0, 12))
+        check_out = check_in + timedelta(hours=rng.uniform(1, 10))
+        rows.append(
+            {
+                "user_id": rng.choice(user_ids),
+                "check_in": check_in,
+                "check_out": check_out,
+                "total_hours": (check_out - check_in).total_seconds() / 3600,
+            }
+        )
+        if len(rows) == SEED_CHUNK_SIZE:
+            await session.execute(insert(Attendance), rows)
+            rows = []
+    if rows:
+        await session.execute(insert(Attendance), rows)
+    await session.commit()
+
+
 async def init_db():
     async with async_engine.begin() as conn:
         # No need to create_all here, Alembic handles migrations
@@ -41,4 +103,7 @@ if __name__ == "__main__":
     # This is generally for initial setup or testing if Alembic isn't run yet.
     # For a proper workflow, Alembic should create the tables.
     # asyncio.run(init_db())
-    asyncio.run(seed_db())
\ No newline at end of file
+    try:
+        asyncio.run(seed_db())
+    finally:
+        password_hasher.shutdown()
\ No newline at end of file
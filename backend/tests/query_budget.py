@@ -0,0 +1,45 @@
+from collections import Counter
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudget:
+    """Counts the SQL statements an engine executes inside a ``with`` block.
+
+    Fails the test when the block exceeds its budget, or when an identical
+    statement repeats (the usual shape of an N+1 lazy load) unless
+    ``allow_repeats`` is set. The failure message lists every statement.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: List[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def repeated(self) -> dict:
+        return {statement: count for statement, count in Counter(self.statements).items() if count > 1}
+
+    def report(self) -> str:
+        lines = [f"{len(self.statements)} statements:"]
+        lines.extend(f"  {statement}" for statement in self.statements)
+        repeated = self.repeated()
+        if repeated:
+            lines.append("repeated statements (possible N+1):")
+            lines.extend(f"  {count}x {statement}" for statement, count in repeated.items())
+        return "\n".join(lines)
+
+    @contextmanager
+    def __call__(self, budget: int, allow_repeats: bool = False):
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, "before_cursor_execute", self._record)
+        assert len(self.statements) <= budget, f"query budget of {budget} exceeded\n{self.report()}"
+        assert allow_repeats or not self.repeated(), f"repeated statements\n{self.report()}"
@@ -0,0 +1,92 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.admission import AuthAdmission, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _request(host="10.0.0.1"):
+    return Request({"type": "http", "client": (host, 1234), "headers": []})
+
+
+def test_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    limiter = RateLimiter(rate_per_minute=60, burst=2, clock=clock)
+    assert limiter.acquire("a") is None
+    assert limiter.acquire("a") is None
+    assert limiter.acquire("a") == pytest.approx(1.0)
+    assert limiter.acquire("b") is None  # buckets are per key
+
+    clock.now = 1.0
+    assert limiter.acquire("a") is None
+    assert limiter.stats() == {"keys": 2, "allowed": 4, "limited": 1}
+
+
+def test_bucket_forgets_least_recent_keys():
+    limiter = RateLimiter(rate_per_minute=60, burst=1, max_keys=2, clock=FakeClock())
+    for key in ("a", "b", "c"):
+        limiter.acquire(key)
+    assert limiter.stats()["keys"] == 2
+    assert limiter.acquire("a") is None
+
+
+def test_zero_rate_disables_limiting():
+    limiter = RateLimiter(rate_per_minute=0, burst=1)
+    assert all(limiter.acquire("a") is None for _ in range(10))
+
+
+async def test_admission_rejects_with_429_then_503():
+    clock = FakeClock()
+    admission = AuthAdmission(
+        by_ip=RateLimiter(60, 5, clock=clock),
+        by_username=RateLimiter(60, 1, clock=clock),
+        max_concurrent=1,
+    )
+    async with admission.admit(_request(), "Alice"):
+        admission.failed("Alice")
+        with pytest.raises(HTTPException) as shed:
+            async with admission.admit(_request(), "bob"):
+                pass
+    assert shed.value.status_code == 503
+    assert admission.shed == 1
+
+    with pytest.raises(HTTPException) as limited:
+        async with admission.admit(_request(), "alice"):
+            pass
+    assert limited.value.status_code == 429
+    assert limited.value.headers["Retry-After"] == "1"
+    assert admission.in_flight == 0
+
+
+async def test_only_failed_logins_drain_the_username_bucket():
+    clock = FakeClock()
+    admission = AuthAdmission(
+        by_ip=RateLimiter(60, 10, clock=clock),
+        by_username=RateLimiter(60, 2, clock=clock),
+        max_concurrent=10,
+    )
+    for _ in range(5):
+        async with admission.admit(_request("10.0.0.1"), "alice"):
+            pass
+    # Guesses from many addresses share the one bucket.
+    for host in ("10.0.0.2", "10.0.0.3"):
+        async with admission.admit(_request(host), "alice"):
+            admission.failed("alice")
+    with pytest.raises(HTTPException) as limited:
+        async with admission.admit(_request("10.0.0.4"), "ALICE"):
+            pass
+    assert limited.value.status_code == 429
+    async with admission.admit(_request("10.0.0.4"), "bob"):
+        pass
+    # The lockout lasts only until a token refills.
+    clock.now = 1.0
+    async with admission.admit(_request("10.0.0.1"), "alice"):
+        pass
@@ -0,0 +1,100 @@
+import asyncio
+
+from sqlalchemy import delete, select
+
+from app import audit, models
+from app.audit import AuditLog
+from tests.conftest import TestingSessionLocal
+
+
+def _log(monkeypatch, max_size=10, batch_size=3, flush_interval=60.0, fail=False, poison=()):
+    log = AuditLog(
+        TestingSessionLocal, max_size=max_size, batch_size=batch_size, flush_interval=flush_interval, max_attempts=2
+    )
+    log.written_batches = []
+
+    async def write(events):
+        if fail:
+            raise ConnectionError("database is down")
+        if any(event["target_id"] in poison for event in events):
+            raise ValueError("rejected by the database")
+        log.written_batches.append(events)
+
+    monkeypatch.setattr(log, "_write", write)
+    return log
+
+
+def test_full_buffer_drops_new_events(monkeypatch):
+    log = _log(monkeypatch, max_size=2)
+    for target_id in range(3):
+        log.record(audit.USER_DELETE, target_id=target_id)
+    assert log.stats()["buffered"] == 2
+    assert log.stats()["dropped"] == 1
+    assert [event["target_id"] for event in log._buffer] == [0, 1]
+
+
+async def test_flush_writes_multi_row_batches(monkeypatch):
+    log = _log(monkeypatch)
+    for target_id in range(7):
+        log.record(audit.USER_CREATE, target_id=target_id)
+    assert await log.flush() == 7
+    assert [len(batch) for batch in log.written_batches] == [3, 3, 1]
+    assert log.stats()["buffered"] == 0
+
+
+async def test_failed_flush_keeps_events_in_order(monkeypatch):
+    log = _log(monkeypatch, fail=True)
+    for target_id in range(5):
+        log.record(audit.USER_CREATE, target_id=target_id)
+    assert await log.flush() == 0
+    assert log.failures == 1
+    assert [event["target_id"] for event in log._buffer] == [0, 1, 2, 3, 4]
+
+
+async def test_rejected_batch_is_split_down_to_the_bad_event(monkeypatch):
+    log = _log(monkeypatch, batch_size=4, poison={2})
+    for target_id in range(6):
+        log.record(audit.USER_CREATE, target_id=target_id)
+    # The first attempt fails and the batch waits for the next flush.
+    assert await log.flush() == 0
+    assert log.stats()["buffered"] == 6
+    # The second uses up its attempts: the batch is split until only the bad
+    # event is left, and everything after it is written too.
+    assert await log.flush() == 5
+    assert [event["target_id"] for batch in log.written_batches for event in batch] == [0, 1, 3, 4, 5]
+    assert log.stats()["rejected"] == 1
+    assert log.stats()["buffered"] == 0
+
+
+async def test_unreachable_database_does_not_use_up_attempts(monkeypatch):
+    log = _log(monkeypatch, fail=True)
+    log.record(audit.LOGIN, target_id=1)
+    for _ in range(5):
+        assert await log.flush() == 0
+    assert log.stats()["rejected"] == 0
+    assert log.stats()["buffered"] == 1
+
+
+async def test_full_batch_wakes_the_flusher_and_stop_drains(monkeypatch):
+    log = _log(monkeypatch, batch_size=2)
+    log.start()
+    log.record(audit.LOGIN, target_id=1)
+    log.record(audit.LOGIN, target_id=2)
+    await asyncio.sleep(0.05)
+    assert log.written == 2
+    log.record(audit.LOGIN, target_id=3)
+    await log.stop()
+    assert log.written == 3
+    assert log.stats()["buffered"] == 0
+
+
+async def test_events_reach_the_table(db_session):
+    log = AuditLog(TestingSessionLocal)
+    log.record(audit.USER_UPDATE, target_id=-1, details={"fields": ["email"]})
+    assert await log.flush() == 1
+    result = await db_session.execute(select(models.AuditEvent).filter(models.AuditEvent.target_id == -1))
+    event = result.scalar_one()
+    assert event.action == audit.USER_UPDATE
+    assert event.details == {"fields": ["email"]}
+    await db_session.execute(delete(models.AuditEvent).where(models.AuditEvent.target_id == -1))
+    await db_session.commit()
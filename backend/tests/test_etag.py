@@ -0,0 +1,24 @@
+import pytest
+
+from app.etag import _matches, make_etag
+
+
+def test_etag_is_stable_and_weak():
+    assert make_etag("users=3") == make_etag("users=3")
+    assert make_etag("users=3") != make_etag("users=4")
+    assert make_etag("users=3").startswith('W/"')
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, False),
+        ("*", True),
+        ('W/"abc"', True),
+        ('"abc"', True),
+        ('"other", W/"abc"', True),
+        ('"other"', False),
+    ],
+)
+def test_if_none_match(header, expected):
+    assert _matches(header, 'W/"abc"') is expected
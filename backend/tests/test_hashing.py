@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from app.hashing import HasherBusy, PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_off_loop():
+    hasher = PasswordHasher(pool="thread", workers=2, queue_size=2)
+    try:
+        hashed = await hasher.hash("securepassword")
+        assert await hasher.verify("securepassword", hashed)
+        assert not await hasher.verify("wrongpassword", hashed)
+        assert hasher.in_flight == 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_saturated():
+    hasher = PasswordHasher(pool="thread", workers=1, queue_size=1)
+    try:
+        results = await asyncio.gather(
+            *(hasher.hash("securepassword") for _ in range(4)), return_exceptions=True
+        )
+        assert sum(isinstance(r, HasherBusy) for r in results) == 2
+        assert hasher.rejected == 2
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_many_chunks_within_capacity():
+    hasher = PasswordHasher(pool="thread", workers=2, queue_size=0)
+    try:
+        hashes = await hasher.hash_many([f"password{i}" for i in range(5)], chunk_size=2)
+        assert len(hashes) == 5
+        assert await hasher.verify("password3", hashes[3])
+    finally:
+        hasher.shutdown()
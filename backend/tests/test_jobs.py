@@ -0,0 +1,95 @@
+import contextlib
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select
+
+from app import models, sweeper
+from app.jobs import Job, JobRunner, lock_key
+from tests.conftest import TestingSessionLocal
+
+
+def test_lock_key_is_stable_and_signed_64_bit():
+    assert lock_key("close_stale_sessions") == lock_key("close_stale_sessions")
+    assert lock_key("close_stale_sessions") != lock_key("maintain_partitions")
+    assert -(2**63) <= lock_key("close_stale_sessions") < 2**63
+
+
+def test_zero_interval_disables_a_job():
+    runner = JobRunner(engine=None)
+    runner.register("off", 0, None)
+    assert runner.jobs == {}
+
+
+def _runner(monkeypatch, locked: bool) -> JobRunner:
+    runner = JobRunner(engine=None)
+
+    @contextlib.asynccontextmanager
+    async def exclusive(name):
+        yield locked
+
+    monkeypatch.setattr(runner, "_exclusive", exclusive)
+    return runner
+
+
+async def test_run_once_counts_runs_failures_and_skips(monkeypatch):
+    async def ok():
+        return {"closed": 3, "note": "ignored"}
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    runner = _runner(monkeypatch, locked=True)
+    job = Job("ok", 60, ok)
+    await runner.run_once(job)
+    assert job.stats()["runs"] == 1
+    assert job.stats()["last_closed"] == 3
+    assert "last_note" not in job.stats()
+
+    failing = Job("broken", 60, broken)
+    await runner.run_once(failing)
+    assert (failing.runs, failing.failures) == (0, 1)
+
+    skipped = Job("ok", 60, ok)
+    await _runner(monkeypatch, locked=False).run_once(skipped)
+    assert (skipped.runs, skipped.skipped) == (0, 1)
+
+
+@pytest.mark.parametrize(
+    "policy, hours",
+    [("zero", 0.0), ("cap", 16.0), ("end_of_day", 14.0)],
+)
+async def test_close_stale_sessions(db_session, policy, hours):
+    now = datetime(2026, 3, 3, 12, 0)
+    user = models.User(username=f"stale_{policy}", email=f"stale_{policy}@example.com", hashed_password="x")
+    fresh_user = models.User(username=f"fresh_{policy}", email=f"fresh_{policy}@example.com", hashed_password="x")
+    db_session.add_all([user, fresh_user])
+    await db_session.flush()
+    stale = models.Attendance(user_id=user.id, check_in=datetime(2026, 3, 1, 10, 0))
+    fresh = models.Attendance(user_id=fresh_user.id, check_in=now - timedelta(hours=2))
+    db_session.add_all([stale, fresh])
+    await db_session.flush()
+    user_ids, stale_id, fresh_id = [user.id, fresh_user.id], stale.id, fresh.id
+    await db_session.commit()
+
+    result = await sweeper.close_stale_sessions(
+        TestingSessionLocal, now=now, policy=policy, max_hours=16, batch_size=1
+    )
+    assert result["closed"] == 1
+
+    db_session.expire_all()
+    rows = (
+        await db_session.execute(
+            select(models.Attendance.id, models.Attendance.total_hours, models.Attendance.check_out).filter(
+                models.Attendance.id.in_([stale_id, fresh_id])
+            )
+        )
+    ).all()
+    closed = {row.id: row for row in rows}
+    assert closed[stale_id].total_hours == pytest.approx(hours)
+    assert closed[fresh_id].check_out is None
+
+    for model in (models.AttendanceDailyRollup, models.AttendanceWeeklyRollup, models.Attendance):
+        await db_session.execute(delete(model).where(model.user_id.in_(user_ids)))
+    await db_session.execute(delete(models.User).where(models.User.id.in_(user_ids)))
+    await db_session.commit()
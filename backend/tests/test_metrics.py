@@ -0,0 +1,15 @@
+from app.metrics import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    registry.observe("GET", "/user/me", 200, 0.003, db_queries=1, db_seconds=0.001)
+    registry.observe("GET", "/user/me", 401, 0.2, db_queries=0, db_seconds=0.0)
+    lines = registry.render()
+
+    labels = 'method="GET",route="/user/me"'
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1' in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.25"}} 2' in lines
+    assert f"http_request_duration_seconds_count{{{labels}}} 2" in lines
+    assert f'http_responses_total{{{labels},status="401"}} 1' in lines
+    assert f"http_request_db_queries_total{{{labels}}} 1" in lines
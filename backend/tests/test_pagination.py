@@ -0,0 +1,51 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app import models
+from app.pagination import decode_cursor, encode_cursor, paginate_users
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("username", ["alice", 42])
+    assert decode_cursor(cursor, "username") == ["alice", 42]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor("id", [1])])
+def test_invalid_cursor_rejected(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor, "username")
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "order_by, values",
+    [
+        ("id", []),
+        ("id", ["1"]),
+        ("id", [1, 2]),
+        ("id", [True]),
+        ("id", [2**31]),
+        ("username", [42, "alice"]),
+        ("username", "alice"),
+        ("audit", [[1]]),
+        ("audit", [2**63]),
+        ("audit", {"id": 1}),
+    ],
+)
+def test_tampered_cursor_values_rejected(order_by, values):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(encode_cursor(order_by, values), order_by)
+    assert exc_info.value.status_code == 400
+
+
+def test_audit_cursor_round_trip():
+    assert decode_cursor(encode_cursor("audit", [2**40]), "audit") == [2**40]
+
+
+def test_cursor_replaces_offset():
+    query = paginate_users(select(models.User), "id", encode_cursor("id", [500]), skip=10, limit=20)
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "users.id >" in sql
+    assert "OFFSET" not in sql
@@ -0,0 +1,88 @@
+from datetime import date, datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app import models, security
+from app.partitions import add_months, expired, is_partitioned, month_start, partition_month, partition_name
+
+
+def test_month_arithmetic():
+    assert month_start(date(2025, 12, 17)) == date(2025, 12, 1)
+    assert add_months(date(2025, 12, 1), 1) == date(2026, 1, 1)
+    assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert add_months(date(2025, 3, 1), -15) == date(2023, 12, 1)
+
+
+def test_partition_names_round_trip():
+    assert partition_name(date(2026, 2, 1)) == "attendance_y2026m02"
+    assert partition_month("attendance_y2026m02") == date(2026, 2, 1)
+    assert partition_month("attendance_default") is None
+
+
+def test_expired_keeps_retention_window():
+    partitions = {date(2025, month, 1): partition_name(date(2025, month, 1)) for month in range(1, 13)}
+    # Keeping 3 full months before December keeps September onwards.
+    assert expired(partitions, date(2025, 12, 17), 3) == [partition_name(date(2025, m, 1)) for m in range(1, 9)]
+    assert expired(partitions, date(2025, 12, 17), 0) == []
+
+
+@pytest.fixture
+async def attendee(db_session):
+    user = models.User(
+        username="partition_user", email="partition_user@example.com", hashed_password=security.get_password_hash("x")
+    )
+    db_session.add(user)
+    await db_session.flush()
+    user_id = user.id
+    await db_session.commit()
+    yield user_id
+    await db_session.rollback()
+    for model in (models.AttendanceDailyRollup, models.AttendanceWeeklyRollup, models.Attendance):
+        await db_session.execute(delete(model).where(model.user_id == user_id))
+    await db_session.execute(delete(models.User).where(models.User.id == user_id))
+    await db_session.commit()
+
+
+async def _open_sessions(db_session, user_id):
+    result = await db_session.execute(
+        select(models.AttendanceOpen.attendance_id).filter(models.AttendanceOpen.user_id == user_id)
+    )
+    return result.scalars().all()
+
+
+async def test_trigger_skips_a_second_open_session(db_session, attendee):
+    assert await is_partitioned(db_session)
+    stmt = insert(models.Attendance).on_conflict_do_nothing().returning(models.Attendance.id)
+    first = await db_session.execute(stmt.values(user_id=attendee, check_in=datetime(2026, 3, 2, 9)))
+    first_id = first.scalar_one()
+    # A different month lands in a different partition; still refused.
+    second = await db_session.execute(stmt.values(user_id=attendee, check_in=datetime(2026, 4, 1, 9)))
+    assert second.first() is None
+    assert await _open_sessions(db_session, attendee) == [first_id]
+    # Closed sessions are history and always go in.
+    closed = await db_session.execute(
+        stmt.values(user_id=attendee, check_in=datetime(2026, 3, 1, 9), check_out=datetime(2026, 3, 1, 17))
+    )
+    assert closed.first() is not None
+    await db_session.commit()
+
+
+async def test_check_out_releases_the_open_session(client_override_db: AsyncClient, db_session, attendee):
+    headers = {"Authorization": f"Bearer {security.create_access_token(data={'sub': 'partition_user'})}"}
+    response = await client_override_db.post("/user/attendance/check-in", headers=headers)
+    assert response.status_code == 200
+    assert await _open_sessions(db_session, attendee) == [response.json()["id"]]
+
+    response = await client_override_db.post("/user/attendance/check-in", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User already checked in"
+
+    response = await client_override_db.post("/user/attendance/check-out", headers=headers)
+    assert response.status_code == 200
+    assert await _open_sessions(db_session, attendee) == []
+
+    response = await client_override_db.post("/user/attendance/check-in", headers=headers)
+    assert response.status_code == 200
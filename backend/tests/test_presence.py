@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from app.presence import CHECK_IN, CHECK_OUT, SNAPSHOT, PresenceIndex
+
+
+def test_deltas_are_deduplicated():
+    index = PresenceIndex()
+    queue = index.subscribe()
+    assert queue.get_nowait() == (SNAPSHOT, {"present": []})
+
+    at = datetime(2025, 12, 1, 9)
+    index.apply(CHECK_IN, 7, at)
+    index.apply(CHECK_IN, 7, at)  # local apply, then the same event via NOTIFY
+    index.apply(CHECK_OUT, 7)
+    index.apply(CHECK_OUT, 7)
+
+    assert queue.get_nowait() == (CHECK_IN, {"user_id": 7, "check_in": at.isoformat()})
+    assert queue.get_nowait() == (CHECK_OUT, {"user_id": 7})
+    assert queue.empty()
+
+
+def test_slow_subscriber_is_resynced():
+    index = PresenceIndex(queue_size=2)
+    queue = index.subscribe()
+    for user_id in range(3):
+        index.apply(CHECK_IN, user_id, datetime(2025, 12, 1, 9))
+
+    event, data = queue.get_nowait()
+    assert event == SNAPSHOT
+    assert [entry["user_id"] for entry in data["present"]] == [0, 1]
+    assert queue.get_nowait()[0] == CHECK_IN
+    assert index.dropped == 1
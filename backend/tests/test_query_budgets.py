@@ -0,0 +1,253 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.routing import APIRoute
+from httpx import AsyncClient
+from sqlalchemy import delete, or_, select
+
+from app import models, security
+from app.main import app
+from app.security import principal_cache
+
+# Maximum SQL statements per request, with a cold principal cache (so every
+# authenticated route pays for its users lookup). Raising a budget should be
+# a deliberate change reviewed alongside the code that needs it.
+QUERY_BUDGETS = {
+    ("POST", "/users/"): 1,
+    ("GET", "/users/"): 1,
+    ("GET", "/users/{user_id}"): 1,
+    ("POST", "/auth/signup"): 1,
+    ("POST", "/auth/login"): 1,
+    ("GET", "/user/me"): 1,
+    ("GET", "/user/attendance/last10"): 3,
+    ("POST", "/user/attendance/check-in"): 2,
+    ("POST", "/user/attendance/check-out"): 2,
+    ("GET", "/admin/users"): 3,
+    ("GET", "/admin/users/search"): 2,
+    ("POST", "/admin/users"): 2,
+    ("POST", "/admin/users/bulk"): 3,
+    ("PUT", "/admin/users/{user_id}"): 2,
+    ("DELETE", "/admin/users/{user_id}"): 2,
+    ("GET", "/admin/users/{user_id}/attendance"): 2,
+    ("GET", "/admin/attendance/recent"): 2,
+    ("GET", "/admin/attendance/export"): 2,
+    ("GET", "/admin/presence"): 1,
+    ("GET", "/admin/presence/stream"): 1,
+    ("GET", "/admin/rollups/weekly"): 2,
+    ("GET", "/admin/rollups/daily"): 2,
+    ("GET", "/admin/timesheets"): 2,
+    ("GET", "/admin/audit"): 2,
+    ("GET", "/admin/stats/principal-cache"): 1,
+    ("GET", "/admin/stats/pool"): 1,
+}
+
+BUDGETED_PREFIXES = ("/users", "/auth", "/user", "/admin")
+
+PREFIX = "budget"
+
+
+def test_every_route_has_a_budget():
+    routes = {
+        (method, route.path)
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path.startswith(BUDGETED_PREFIXES)
+        for method in route.methods
+    }
+    assert routes - set(QUERY_BUDGETS) == set()
+
+
+@pytest.fixture
+async def accounts(db_session):
+    hashed_password = security.get_password_hash("budgetpassword")
+    admin = models.User(
+        username=f"{PREFIX}_admin", email=f"{PREFIX}_admin@example.com", hashed_password=hashed_password, role="admin"
+    )
+    user = models.User(
+        username=f"{PREFIX}_user", email=f"{PREFIX}_user@example.com", hashed_password=hashed_password, role="user"
+    )
+    db_session.add_all([admin, user])
+    await db_session.flush()
+    created = {
+        "admin": {"id": admin.id, "headers": _auth(admin.username)},
+        "user": {"id": user.id, "headers": _auth(user.username)},
+    }
+    await db_session.commit()
+    yield created
+    await db_session.rollback()
+    owned = models.User.username.like(f"{PREFIX}%")
+    user_ids = select(models.User.id).where(owned)
+    for model in (models.AttendanceDailyRollup, models.AttendanceWeeklyRollup, models.Attendance):
+        await db_session.execute(delete(model).where(model.user_id.in_(user_ids)))
+    await db_session.execute(delete(models.User).where(or_(owned, models.User.email.like(f"{PREFIX}%"))))
+    await db_session.commit()
+
+
+def _auth(username):
+    return {"Authorization": f"Bearer {security.create_access_token(data={'sub': username})}"}
+
+
+def _budget(method, path):
+    principal_cache.clear()
+    return QUERY_BUDGETS[(method, path)]
+
+
+async def test_users_router_budgets(client_override_db: AsyncClient, query_budget, accounts):
+    with query_budget(_budget("POST", "/users/")):
+        response = await client_override_db.post(
+            "/users/",
+            json={"username": f"{PREFIX}_new", "email": f"{PREFIX}_new@example.com", "password": "securepassword"},
+        )
+    assert response.status_code == 200
+
+    with query_budget(_budget("GET", "/users/")):
+        response = await client_override_db.get("/users/")
+    assert response.status_code == 200
+
+    with query_budget(_budget("GET", "/users/{user_id}")):
+        response = await client_override_db.get(f"/users/{accounts['user']['id']}")
+    assert response.status_code == 200
+
+
+async def test_auth_router_budgets(client_override_db: AsyncClient, query_budget, accounts):
+    with query_budget(_budget("POST", "/auth/signup")):
+        response = await client_override_db.post(
+            "/auth/signup",
+            json={"username": f"{PREFIX}_signup", "email": f"{PREFIX}_signup@example.com", "password": "securepassword"},
+        )
+    assert response.status_code == 200
+
+    with query_budget(_budget("POST", "/auth/login")):
+        response = await client_override_db.post(
+            "/auth/login", data={"username": f"{PREFIX}_user", "password": "budgetpassword"}
+        )
+    assert response.status_code == 200
+
+
+async def test_user_router_budgets(client_override_db: AsyncClient, query_budget, accounts):
+    headers = accounts["user"]["headers"]
+
+    with query_budget(_budget("GET", "/user/me")):
+        response = await client_override_db.get("/user/me", headers=headers)
+    assert response.status_code == 200
+
+    with query_budget(_budget("POST", "/user/attendance/check-in")):
+        response = await client_override_db.post("/user/attendance/check-in", headers=headers)
+    assert response.status_code == 200
+
+    with query_budget(_budget("POST", "/user/attendance/check-out")):
+        response = await client_override_db.post("/user/attendance/check-out", headers=headers)
+    assert response.status_code == 200
+
+    with query_budget(_budget("GET", "/user/attendance/last10")):
+        response = await client_override_db.get("/user/attendance/last10", headers=headers)
+    assert response.status_code == 200
+
+    # A revalidation only pays for the principal and the version lookup.
+    with query_budget(QUERY_BUDGETS[("GET", "/user/attendance/last10")] - 1):
+        response = await client_override_db.get(
+            "/user/attendance/last10", headers={**headers, "If-None-Match": response.headers["ETag"]}
+        )
+    assert response.status_code == 304
+
+
+async def test_admin_router_budgets(client_override_db: AsyncClient, query_budget, accounts, db_session):
+    headers = accounts["admin"]["headers"]
+    user_id = accounts["user"]["id"]
+    now = datetime.utcnow()
+    db_session.add_all(
+        models.Attendance(user_id=user_id, check_in=now - timedelta(days=day, hours=8), check_out=now - timedelta(days=day))
+        for day in range(1, 6)
+    )
+    await db_session.commit()
+
+    with query_budget(_budget("GET", "/admin/users")):
+        response = await client_override_db.get("/admin/users", headers=headers)
+    assert response.status_code == 200
+
+    with query_budget(_budget("GET", "/admin/users/search")):
+        response = await client_override_db.get("/admin/users/search", headers=headers, params={"q": f"{PREFIX}_u"})
+    assert response.status_code == 200
+    assert [user["username"] for user in response.json()] == [f"{PREFIX}_user"]
+
+    with query_budget(_budget("POST", "/admin/users")):
+        response = await client_override_db.post(
+            "/admin/users",
+            headers=headers,
+            json={"username": f"{PREFIX}_created", "email": f"{PREFIX}_created@example.com", "password": "securepassword"},
+        )
+    assert response.status_code == 200
+    created_id = response.json()["id"]
+
+    with query_budget(_budget("POST", "/admin/users/bulk")):
+        response = await client_override_db.post(
+            "/admin/users/bulk",
+            headers=headers,
+            json=[
+                {"username": f"{PREFIX}_bulk{i}", "email": f"{PREFIX}_bulk{i}@example.com", "password": "securepassword"}
+                for i in range(3)
+            ],
+        )
+    assert response.status_code == 200
+    assert response.json()["created"] == 3
+
+    with query_budget(_budget("PUT", "/admin/users/{user_id}")):
+        response = await client_override_db.put(
+            f"/admin/users/{created_id}",
+            headers=headers,
+            json={"username": f"{PREFIX}_renamed", "email": f"{PREFIX}_created@example.com", "password": "securepassword"},
+        )
+    assert response.status_code == 200
+
+    with query_budget(_budget("DELETE", "/admin/users/{user_id}")):
+        response = await client_override_db.delete(f"/admin/users/{created_id}", headers=headers)
+    assert response.status_code == 200
+
+    with query_budget(_budget("GET", "/admin/users/{user_id}/attendance")):
+        response = await client_override_db.get(f"/admin/users/{user_id}/attendance", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+
+    with query_budget(_budget("GET", "/admin/attendance/recent")):
+        response = await client_override_db.get(
+            "/admin/attendance/recent",
+            headers=headers,
+            params={"user_id": [user_id, accounts["admin"]["id"]], "per_user": 3},
+        )
+    assert response.status_code == 200
+    recent = {entry["user_id"]: entry["attendance"] for entry in response.json()}
+    assert len(recent[user_id]) == 3
+    assert recent[accounts["admin"]["id"]] == []
+
+    with query_budget(_budget("GET", "/admin/attendance/export")):
+        response = await client_override_db.get(
+            "/admin/attendance/export", headers=headers, params={"user_id": user_id, "format": "ndjson"}
+        )
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 5
+
+    with query_budget(_budget("GET", "/admin/rollups/weekly")):
+        response = await client_override_db.get("/admin/rollups/weekly", headers=headers)
+    assert response.status_code == 200
+
+    with query_budget(_budget("GET", "/admin/rollups/daily")):
+        response = await client_override_db.get("/admin/rollups/daily", headers=headers, params={"user_id": user_id})
+    assert response.status_code == 200
+
+    with query_budget(_budget("GET", "/admin/timesheets")):
+        response = await client_override_db.get(
+            "/admin/timesheets",
+            headers=headers,
+            params={
+                "from": (now - timedelta(days=7)).date().isoformat(),
+                "to": (now + timedelta(days=1)).date().isoformat(),
+                "user_id": user_id,
+            },
+        )
+    assert response.status_code == 200
+    assert [sheet["sessions"] for sheet in response.json()] == [5]
+    assert response.json()[0]["total_hours"] == pytest.approx(40.0)
+
+    for path in ("/admin/presence", "/admin/audit", "/admin/stats/principal-cache", "/admin/stats/pool"):
+        with query_budget(_budget("GET", path)):
+            response = await client_override_db.get(path, headers=headers)
+        assert response.status_code == 200
@@ -0,0 +1,124 @@
+from fastapi import FastAPI, Request
+from httpx import AsyncClient
+import pytest
+from sqlalchemy import delete, insert
+
+from app import models, replica
+from app.db import get_db
+from app.main import app as main_app
+from app.replica import READ_PRIMARY_COOKIE, ReadYourWritesMiddleware, recent_writers
+from app.security import create_access_token, principal_cache
+
+app = FastAPI()
+app.add_middleware(ReadYourWritesMiddleware)
+
+
+@app.get("/read")
+async def read(request: Request):
+    return {"primary": replica.wrote_recently(request)}
+
+
+@app.post("/write")
+async def write():
+    return {}
+
+
+@app.post("/fail", status_code=400)
+async def fail():
+    return {}
+
+
+async def test_writer_reads_from_primary():
+    recent_writers.clear()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'writer'})}"}
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        assert (await client.get("/read", headers=headers)).json() == {"primary": False}
+
+        response = await client.post("/fail", headers=headers)
+        assert READ_PRIMARY_COOKIE not in response.cookies
+        assert (await client.get("/read", headers=headers)).json() == {"primary": False}
+
+        response = await client.post("/write", headers=headers)
+        assert response.cookies[READ_PRIMARY_COOKIE] == "1"
+        client.cookies.clear()
+        # Same worker: recognized by token subject even without the cookie.
+        assert (await client.get("/read", headers=headers)).json() == {"primary": True}
+
+
+async def test_cookie_routes_reads_to_primary():
+    recent_writers.clear()
+    async with AsyncClient(app=app, base_url="http://test", cookies={READ_PRIMARY_COOKIE: "1"}) as client:
+        assert (await client.get("/read")).json() == {"primary": True}
+
+
+def _user(user_id, username):
+    return insert(models.User).values(
+        id=user_id, username=username, email=f"{username}@example.com", hashed_password="x", role="user"
+    )
+
+
+@pytest.fixture
+async def replica_client(db_session, read_replica):
+    """The real app with a replica: ``get_db`` is the test database and
+    ``get_read_db`` the replica one. The middleware is added here, as the
+    app only installs it when READ_DATABASE_URL is set."""
+    main_app.dependency_overrides[get_db] = lambda: db_session
+    principal_cache.clear()
+    recent_writers.clear()
+    async with AsyncClient(app=ReadYourWritesMiddleware(main_app), base_url="http://test") as client:
+        yield client
+    main_app.dependency_overrides.clear()
+    recent_writers.clear()
+    await db_session.execute(delete(models.User).where(models.User.username.like("replica_%")))
+    await db_session.commit()
+    async with read_replica() as session:
+        await session.execute(delete(models.User))
+        await session.commit()
+
+
+async def test_reads_go_to_the_replica_until_the_client_writes(replica_client, read_replica):
+    # Only the replica has this user, so finding it proves where the read went.
+    async with read_replica() as session:
+        await session.execute(_user(900001, "replica_only"))
+        await session.commit()
+
+    response = await replica_client.get("/users/900001")
+    assert response.status_code == 200
+    assert response.json()["username"] == "replica_only"
+
+    response = await replica_client.post(
+        "/users/",
+        json={"username": "replica_writer", "email": "replica_writer@example.com", "password": "securepassword"},
+    )
+    assert response.status_code == 200
+    assert response.cookies[READ_PRIMARY_COOKIE] == "1"
+    written = response.json()["id"]
+
+    # Within READ_YOUR_WRITES_SECONDS the same client reads the primary: it
+    # sees its own user, and no longer the replica-only one.
+    assert (await replica_client.get(f"/users/{written}")).status_code == 200
+    assert (await replica_client.get("/users/900001")).status_code == 404
+
+    # Once the window is over, reads go back to the replica, which has not
+    # caught up with the write.
+    replica_client.cookies.clear()
+    recent_writers.clear()
+    assert (await replica_client.get(f"/users/{written}")).status_code == 404
+    assert (await replica_client.get("/users/900001")).status_code == 200
+
+
+async def test_deleted_user_is_rejected_while_the_replica_lags(replica_client, db_session, read_replica):
+    async with read_replica() as replica_session:
+        for session in (db_session, replica_session):
+            await session.execute(_user(900002, "replica_deleted"))
+            await session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'replica_deleted'})}"}
+    assert (await replica_client.get("/user/me", headers=headers)).status_code == 200
+
+    # Deleted on the primary, not yet on the replica. The principal is loaded
+    # from the primary, so the token stops working at once.
+    await db_session.execute(delete(models.User).where(models.User.id == 900002))
+    await db_session.commit()
+    principal_cache.clear()
+    assert (await replica_client.get("/user/me", headers=headers)).status_code == 401
+    assert (await replica_client.get("/user/attendance/last10", headers=headers)).status_code == 401
@@ -0,0 +1,74 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import delete, insert, select, update
+
+from app import models, security
+from app.rollups import aggregate, split_by_day, upserts_over, week_start
+
+
+def test_split_same_day():
+    assert split_by_day(datetime(2025, 12, 1, 9), datetime(2025, 12, 1, 17, 30)) == [(date(2025, 12, 1), 8.5)]
+
+
+def test_split_across_midnight():
+    chunks = split_by_day(datetime(2025, 12, 1, 22), datetime(2025, 12, 2, 6))
+    assert chunks == [(date(2025, 12, 1), 2.0), (date(2025, 12, 2), 6.0)]
+
+
+def test_split_ending_exactly_at_midnight():
+    assert split_by_day(datetime(2025, 12, 1, 20), datetime(2025, 12, 2)) == [(date(2025, 12, 1), 4.0)]
+
+
+def test_aggregate_counts_session_on_start_day_and_week():
+    # Sunday night into Monday crosses an ISO week boundary.
+    daily, weekly = aggregate([(1, datetime(2025, 12, 7, 23), datetime(2025, 12, 8, 1))])
+    assert daily[(1, date(2025, 12, 7))] == [1.0, 1]
+    assert daily[(1, date(2025, 12, 8))] == [1.0, 0]
+    assert weekly[(1, date(2025, 12, 1))] == [1.0, 1]
+    assert weekly[(1, date(2025, 12, 8))] == [1.0, 0]
+
+
+@pytest.mark.parametrize("day", [date(2025, 12, 8), date(2025, 12, 10), date(2025, 12, 14)])
+def test_week_starts_on_monday(day):
+    assert week_start(day) == date(2025, 12, 8)
+
+
+async def test_upserts_over_matches_aggregate(db_session):
+    user = models.User(
+        username="rollup_sql", email="rollup_sql@example.com", hashed_password=security.get_password_hash("x")
+    )
+    db_session.add(user)
+    await db_session.flush()
+    sessions = [
+        (datetime(2025, 12, 7, 23), datetime(2025, 12, 8, 1)),
+        (datetime(2025, 12, 8, 20), datetime(2025, 12, 10, 4)),
+        (datetime(2025, 12, 11, 9), datetime(2025, 12, 12)),
+    ]
+    for check_in, check_out in sessions:
+        await db_session.execute(insert(models.Attendance).values(user_id=user.id, check_in=check_in))
+        closed = (
+            update(models.Attendance)
+            .where(models.Attendance.user_id == user.id, models.Attendance.check_out.is_(None))
+            .values(check_out=check_out)
+            .returning(*models.Attendance.__table__.c)
+            .cte("closed")
+        )
+        await db_session.execute(select(closed.c.id).add_cte(*upserts_over(closed)))
+
+    daily, weekly = aggregate([(user.id, check_in, check_out) for check_in, check_out in sessions])
+    for model, period, expected in (
+        (models.AttendanceDailyRollup, "day", daily),
+        (models.AttendanceWeeklyRollup, "week_start", weekly),
+    ):
+        rows = await db_session.execute(
+            select(getattr(model, period), model.total_hours, model.sessions).filter(model.user_id == user.id)
+        )
+        assert {row[0]: [pytest.approx(row[1]), row[2]] for row in rows} == {
+            key[1]: value for key, value in expected.items()
+        }
+
+    for model in (models.AttendanceDailyRollup, models.AttendanceWeeklyRollup, models.Attendance):
+        await db_session.execute(delete(model).where(model.user_id == user.id))
+    await db_session.execute(delete(models.User).where(models.User.id == user.id))
+    await db_session.commit()
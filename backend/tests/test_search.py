@@ -0,0 +1,17 @@
+from sqlalchemy.dialects import postgresql
+
+from app.search import search_users
+
+
+def _compile(q):
+    return search_users(q, 10).compile(dialect=postgresql.dialect())
+
+
+def test_like_wildcards_are_escaped():
+    params = _compile("50%_off").params
+    assert "50\\%\\_off%" in params.values()
+
+
+def test_substring_match_needs_three_characters():
+    assert "%ab%" not in _compile("ab").params.values()
+    assert "%abc%" in _compile(" ABC ").params.values()
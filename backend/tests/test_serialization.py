@@ -0,0 +1,30 @@
+import json
+from collections import namedtuple
+from datetime import datetime
+from typing import List
+
+import pytest
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app import schemas, serialization
+from app.serialization import dump_rows, fields_of
+
+AttendanceRow = namedtuple("AttendanceRow", fields_of(schemas.Attendance))
+
+ROWS = [
+    AttendanceRow(datetime(2025, 12, 1, 9, 0, 5, 120000), datetime(2025, 12, 1, 17, 30), 8.4986, 1, 7),
+    AttendanceRow(datetime(2025, 12, 2, 9, 0), None, 0.0, 2, 7),
+]
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+async def test_fast_path_matches_response_model(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson not installed")
+    field = create_response_field(name="response", type_=List[schemas.Attendance])
+    expected = await serialize_response(field=field, response_content=ROWS)
+
+    assert json.loads(dump_rows(ROWS, fields_of(schemas.Attendance))) == expected
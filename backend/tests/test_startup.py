@@ -0,0 +1,18 @@
+import pytest
+
+from app import startup
+
+
+def test_migrations_have_a_single_head():
+    assert len(startup.alembic_heads()) == 1
+
+
+async def test_migration_check_policies(monkeypatch):
+    async def behind(engine):
+        return {"b7e2049c5f13"}
+
+    monkeypatch.setattr(startup, "database_revisions", behind)
+    await startup.check_migrations(None, "off")
+    await startup.check_migrations(None, "warn")
+    with pytest.raises(startup.MigrationsPending):
+        await startup.check_migrations(None, "fail")
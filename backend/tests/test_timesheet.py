@@ -0,0 +1,139 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from app.timesheet import compute, sessions_query
+
+H = 3600.0
+MONDAY = date(2026, 3, 2)
+
+
+def _compute(sessions, start=MONDAY, days=7, **rules):
+    rules = {"daily_threshold": 8.0, "weekly_threshold": 40.0, "night_start": 22.0, "night_end": 6.0, **rules}
+    user_ids, check_ins, check_outs = zip(*sessions) if sessions else ((), (), ())
+    sheet = compute(user_ids, check_ins, check_outs, start, date.fromordinal(start.toordinal() + days), **rules)
+    return sheet, {summary["user_id"]: summary for summary in sheet.summaries()}
+
+
+def test_daily_overtime():
+    _, sheets = _compute([(1, 9 * H, 19 * H)])
+    assert sheets[1]["total_hours"] == pytest.approx(10.0)
+    assert sheets[1]["daily_overtime_hours"] == pytest.approx(2.0)
+    assert sheets[1]["regular_hours"] == pytest.approx(8.0)
+
+
+def test_weekly_overtime_only_counts_regular_hours():
+    # Six 9-hour days: 6h of daily overtime, 48h regular, 8h past 40.
+    _, sheets = _compute([(1, day * 24 * H + 8 * H, day * 24 * H + 17 * H) for day in range(6)])
+    assert sheets[1]["daily_overtime_hours"] == pytest.approx(6.0)
+    assert sheets[1]["weekly_overtime_hours"] == pytest.approx(8.0)
+    assert sheets[1]["overtime_hours"] == pytest.approx(14.0)
+
+
+def test_night_shift_is_split_at_midnight():
+    sheet, sheets = _compute([(1, 20 * H, 28 * H)], daily_threshold=0)
+    assert sheets[1]["night_hours"] == pytest.approx(6.0)
+    assert [(day["day"], day["hours"], day["night_hours"], day["sessions"]) for day in sheet.days_of(0)] == [
+        (date(2026, 3, 2), 4.0, 2.0, 1),
+        (date(2026, 3, 3), 4.0, 4.0, 0),
+    ]
+
+
+def test_overlapping_and_duplicate_sessions_are_counted_once():
+    _, sheets = _compute([(1, 9 * H, 17 * H), (1, 9 * H, 17 * H), (1, 16 * H, 18 * H), (2, 10 * H, 12 * H)])
+    assert sheets[1]["sessions"] == 3
+    assert sheets[1]["total_hours"] == pytest.approx(9.0)
+    assert sheets[1]["overlapping_sessions"] == 2
+    assert sheets[1]["duplicate_sessions"] == 1
+    assert sheets[1]["overlap_hours"] == pytest.approx(9.0)
+    assert sheets[2]["overlapping_sessions"] == 0
+
+
+def test_sessions_are_clipped_to_the_period():
+    # Started the evening before the period: only the hours inside count,
+    # and the session belongs to the day it started.
+    sheet, sheets = _compute([(1, -2 * H, 3 * H), (1, 6 * 24 * H + 20 * H, 7 * 24 * H + 5 * H)])
+    assert sheets[1]["total_hours"] == pytest.approx(7.0)
+    assert sheets[1]["sessions"] == 1
+
+
+def test_weeks_cut_by_the_period_boundary():
+    sheet, _ = _compute([(1, 8 * H, 12 * H)], start=date(2026, 3, 4), days=7)
+    assert sheet.week_starts == [date(2026, 3, 2), date(2026, 3, 9)]
+    assert sheet.weekly_hours.shape == (1, 2)
+    assert sheet.hours.shape == (1, 7)
+
+
+def test_weekly_overtime_counts_the_days_before_a_mid_week_period():
+    # Wednesday to Wednesday; Monday and Tuesday already reached 40 hours.
+    day = 24 * H
+    sessions = [
+        (1, -2 * day, -2 * day + 20 * H),
+        (1, -day, -day + 20 * H),
+        (1, 8 * H, 16 * H),
+        (1, 7 * day, 7 * day + 8 * H),
+    ]
+    sheet, sheets = _compute(sessions, start=date(2026, 3, 4), days=8, daily_threshold=0)
+    assert sheets[1]["total_hours"] == pytest.approx(16.0)
+    assert sheets[1]["sessions"] == 2
+    # Wednesday's hours are all past 40; the next Wednesday starts a new week.
+    assert sheets[1]["weekly_overtime_hours"] == pytest.approx(8.0)
+    assert [(day["day"], day["weekly_overtime_hours"]) for day in sheet.days_of(0)] == [
+        (date(2026, 3, 4), 8.0),
+        (date(2026, 3, 11), 0.0),
+    ]
+    assert sheet.weekly_hours.tolist() == [[48.0, 8.0]]
+
+
+def test_days_add_up_to_the_summary():
+    # 10-hour days Monday to Saturday: 12h daily overtime, 48h regular, 8h past 40 on Friday and Saturday.
+    sheet, sheets = _compute([(1, day * 24 * H + 8 * H, day * 24 * H + 18 * H) for day in range(6)])
+    days = sheet.days_of(0)
+    assert [day["weekly_overtime_hours"] for day in days] == pytest.approx([0, 0, 0, 0, 0, 8.0])
+    for field in ("overtime_hours", "daily_overtime_hours", "weekly_overtime_hours"):
+        assert sum(day[field] for day in days) == pytest.approx(sheets[1][field])
+    assert sheets[1]["overtime_hours"] == pytest.approx(20.0)
+
+
+def test_overlaps_before_the_period_are_not_reported():
+    sessions = [(1, -24 * H + 9 * H, -24 * H + 17 * H), (1, -24 * H + 9 * H, -24 * H + 17 * H), (1, 9 * H, 12 * H)]
+    _, sheets = _compute(sessions, start=date(2026, 3, 4))
+    assert sheets[1]["overlapping_sessions"] == 0
+    assert sheets[1]["duplicate_sessions"] == 0
+    assert sheets[1]["overlap_hours"] == 0.0
+
+
+def test_empty_period():
+    sheet, sheets = _compute([])
+    assert sheets == {}
+    assert sheet.hours.shape == (0, 7)
+
+
+def test_period_must_not_be_empty():
+    with pytest.raises(ValueError):
+        compute([], [], [], MONDAY, MONDAY)
+
+
+def test_month_for_ten_thousand_users():
+    rng = np.random.default_rng(0)
+    n = 10_000 * 22
+    check_ins = rng.integers(0, 31, n) * 24 * H + rng.uniform(6, 12, n) * H
+    sheet, sheets = _compute(
+        list(zip(rng.integers(0, 10_000, n), check_ins, check_ins + rng.uniform(4, 11, n) * H)), days=31
+    )
+    assert len(sheets) == 10_000
+    assert sheet.hours.sum() == pytest.approx(sum(summary["total_hours"] for summary in sheets.values()))
+
+
+def test_sessions_query_is_one_row_of_arrays():
+    sql = str(sessions_query(MONDAY, date(2026, 3, 9), [1, 2]))
+    assert sql.count("array_agg(") == 3
+    assert "attendance.check_in <" in sql
+
+
+def test_sessions_query_measures_from_the_origin():
+    query = sessions_query(MONDAY, date(2026, 3, 9), origin=date(2026, 3, 4))
+    params = query.compile().params
+    assert datetime(2026, 3, 4) in params.values()
+    assert datetime(2026, 2, 23) in params.values()